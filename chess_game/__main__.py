@@ -0,0 +1,4 @@
+import sys
+from .console import main
+
+sys.exit(main())
@@ -0,0 +1,298 @@
+import argparse
+import random
+import sys
+import time
+import numpy as np
+from .bitboard import (KING_ATTACKS, KNIGHT_ATTACKS, ARCHER_SHOTS, THUNDER_RING, CHECKER_STEPS, CHECKER_JUMPS,
+                       ROOK_DIRECTIONS, BISHOP_DIRECTIONS)
+from .engine import PIECE_VALUES, DEFAULT_VALUE, evaluate, generate_moves, is_king_capture
+from .position import FIRST_MOVE, LAST_MOVE_DOUBLE, PIECES, Position
+from .rules import START_POSITIONS, start_position, get_threatened_pieces, make_move
+
+# Пакет из N досок хранится как массив кодов фигур (N, 64) и массив
+# счетчиков (N, 64) - те же 128 байт, что выдает Position.pack().
+# Маски ходов имеют форму (N, 64, 64): доска, клетка фигуры, клетка хода.
+KINDS = ['King', 'Queen', 'Rook', 'Bishop', 'Knight', 'Pawn', 'Wizard', 'Archer', 'Thunderer', 'Checker', 'CheckerKing']
+KIND = {name: index for index, name in enumerate(KINDS)}
+MOBILITY_WEIGHT = 2
+SQUARES = np.arange(64)
+
+
+def _mask_table(masks):
+    return np.array([[mask >> target & 1 for target in range(64)] for mask in masks], dtype=bool)
+
+
+def _ray_index(dr, dc):
+    index = np.full((64, 7), 64, dtype=np.intp)
+    for sq in range(64):
+        r, c = divmod(sq, 8)
+        for step in range(7):
+            r, c = r + dr, c + dc
+            if not (0 <= r < 8 and 0 <= c < 8):
+                break
+            index[sq, step] = r * 8 + c
+    return index
+
+
+def _jump_triples(is_white):
+    triples = [(sq, over.bit_length() - 1, land.bit_length() - 1)
+               for sq in range(64) for over, land in CHECKER_JUMPS[is_white][sq]]
+    return tuple(np.array(column, dtype=np.intp) for column in zip(*triples))
+
+
+def _square_bonus(piece, sq):
+    r, c = divmod(sq, 8)
+    name = type(piece).__name__
+    value = PIECE_VALUES.get(name, DEFAULT_VALUE)
+    if name in ('Pawn', 'Checker'):
+        value += 5 * (r if piece.is_white else 7 - r)
+    elif name != 'King':
+        value += int(6 - abs(3.5 - r) - abs(3.5 - c))
+    return value if piece.is_white else -value
+
+
+KING_TABLE = _mask_table(KING_ATTACKS)
+KNIGHT_TABLE = _mask_table(KNIGHT_ATTACKS)
+ARCHER_TABLE = _mask_table(ARCHER_SHOTS)
+THUNDER_TABLE = _mask_table(THUNDER_RING)
+CHECKER_STEP_TABLES = {is_white: _mask_table(CHECKER_STEPS[is_white]) for is_white in (True, False)}
+CHECKER_JUMP_TRIPLES = {is_white: _jump_triples(is_white) for is_white in (True, False)}
+KING_STEP_TABLE = CHECKER_STEP_TABLES[True] | CHECKER_STEP_TABLES[False]
+RAY_INDEX = {direction: _ray_index(*direction) for direction in ROOK_DIRECTIONS + BISHOP_DIRECTIONS}
+
+STEP_TABLES = np.zeros((len(KINDS), 64, 64), dtype=bool)
+STEP_TABLES[KIND['King']] = KING_TABLE
+STEP_TABLES[KIND['Knight']] = KNIGHT_TABLE
+STEP_TABLES[KIND['Archer']] = KING_TABLE
+
+
+def _by_code(values, default):
+    return np.array([default] + [values(piece) for piece in PIECES[1:]])
+
+
+PIECE_KIND = _by_code(lambda piece: KIND[type(piece).__name__], -1).astype(np.int8)
+PIECE_WHITE = _by_code(lambda piece: piece.is_white, False)
+STEP_PIECE = _by_code(lambda piece: type(piece).__name__ in ('King', 'Knight', 'Archer'), False)
+ROOK_PIECE = _by_code(lambda piece: type(piece).__name__ in ('Rook', 'Queen', 'Thunderer'), False)
+BISHOP_PIECE = _by_code(lambda piece: type(piece).__name__ in ('Bishop', 'Queen', 'Wizard'), False)
+PIECE_SQUARE_SCORE = np.array([[0] * 64] + [[_square_bonus(piece, sq) for sq in range(64)] for piece in PIECES[1:]],
+                              dtype=np.int32)
+
+
+class BoardBatch:
+    def __init__(self, codes, counters):
+        self.codes = codes
+        self.counters = counters
+        self.kinds = PIECE_KIND[codes]
+        self.occupied = codes != 0
+        self.white = PIECE_WHITE[codes]
+        self.black = self.occupied & ~self.white
+        self._moves = None
+
+    @classmethod
+    def from_fields(cls, fields):
+        data = np.frombuffer(b''.join(field.pack() for field in fields), dtype=np.uint8).reshape(-1, 128)
+        return cls(data[:, :64].copy(), data[:, 64:].copy())
+
+    def __len__(self):
+        return len(self.codes)
+
+    def pieces(self, name, is_white=None):
+        mask = self.kinds == KIND[name]
+        if is_white is not None:
+            mask &= self.white if is_white else self.black
+        return mask
+
+    def _own(self, boards, squares):
+        return np.where(self.white[boards, squares][:, None], self.white[boards], self.black[boards])
+
+    def move_masks(self):
+        # Ходы считаются только для занятых клеток: индексы фигур берутся через
+        # nonzero, а цели ходов записываются в общий массив одним присваиванием.
+        if self._moves is not None:
+            return self._moves
+        moves = np.zeros((len(self), 64, 64), dtype=bool)
+        self._taken = {is_white: np.zeros((len(self), 64), dtype=bool) for is_white in (True, False)}
+        empty = ~self.occupied
+
+        boards, squares = np.nonzero(STEP_PIECE[self.codes])
+        moves[boards, squares] = STEP_TABLES[self.kinds[boards, squares], squares] & ~self._own(boards, squares)
+
+        padded = np.ones((len(self), 65), dtype=bool)
+        padded[:, :64] = self.occupied
+        for directions, sliders in ((ROOK_DIRECTIONS, ROOK_PIECE), (BISHOP_DIRECTIONS, BISHOP_PIECE)):
+            boards, squares = np.nonzero(sliders[self.codes])
+            rows = np.arange(len(boards))[:, None]
+            # Граница доски (индекс 64) считается своей фигурой: на нее хода нет.
+            own = np.ones((len(boards), 65), dtype=bool)
+            own[:, :64] = self._own(boards, squares)
+            for direction in directions:
+                index = RAY_INDEX[direction][squares]
+                blocked = np.logical_or.accumulate(padded[boards[:, None], index], axis=1)
+                reach = np.ones_like(blocked)
+                reach[:, 1:] = ~blocked[:, :-1]
+                reach &= ~own[rows, index]
+                hit, step = np.nonzero(reach)
+                moves[boards[hit], squares[hit], index[hit, step]] = True
+
+        boards, squares = np.nonzero(self.kinds == KIND['Archer'])
+        moves[boards, squares] |= ARCHER_TABLE[squares] & self.occupied[boards] & ~self._own(boards, squares)
+        boards, squares = np.nonzero((self.kinds == KIND['Wizard']) & (self.counters >= 3))
+        moves[boards, squares] |= empty[boards]
+        # Заряженный громовержец бьет все соседние клетки, в том числе свои.
+        boards, squares = np.nonzero((self.kinds == KIND['Thunderer']) & (self.counters >= 4))
+        moves[boards, squares] |= THUNDER_TABLE[squares]
+
+        for is_white in (True, False):
+            other = self.black if is_white else self.white
+            step = 8 if is_white else -8
+            boards, squares = np.nonzero(self.pieces('Pawn', is_white))
+            cols = squares % 8
+            ahead = squares + step
+            inside = (ahead >= 0) & (ahead < 64)
+            ahead_index = np.clip(ahead, 0, 63)
+            single = inside & empty[boards, ahead_index]
+            moves[boards[single], squares[single], ahead[single]] = True
+            double = squares + 2 * step
+            double_index = np.clip(double, 0, 63)
+            first = (self.counters[boards, squares] & FIRST_MOVE).astype(bool)
+            double_ok = single & (double >= 0) & (double < 64) & empty[boards, double_index] & first
+            moves[boards[double_ok], squares[double_ok], double[double_ok]] = True
+            passant_row = squares // 8 == (4 if is_white else 3)
+            for dc in (-1, 1):
+                beside = (cols + dc >= 0) & (cols + dc < 8)
+                target = np.clip(ahead + dc, 0, 63)
+                capture = inside & beside & other[boards, target]
+                moves[boards[capture], squares[capture], target[capture]] = True
+                # Взятие на проходе: рядом пешка соперника, только что сделавшая двойной ход.
+                neighbour = np.clip(squares + dc, 0, 63)
+                passant = (passant_row & beside & (self.kinds[boards, neighbour] == KIND['Pawn'])
+                           & other[boards, neighbour] & (self.counters[boards, neighbour] & LAST_MOVE_DOUBLE).astype(bool))
+                moves[boards[passant], squares[passant], target[passant]] = True
+
+            # Шашка, которая может бить, обязана пройти цепочку взятий до конца.
+            # Первый прыжок ищется сразу для всех досок, а цепочки считает класс
+            # фигуры только для таких шашек; остальные шашки и дамки делают шаг.
+            men, kings = self.pieces('Checker', is_white), self.pieces('CheckerKing', is_white)
+            can_jump = np.zeros_like(men)
+            for direction, movers in ((is_white, men | kings), (not is_white, kings)):
+                start, over, land = CHECKER_JUMP_TRIPLES[direction]
+                boards, triples = np.nonzero(movers[:, start] & other[:, over] & empty[:, land])
+                can_jump[boards, start[triples]] = True
+            boards, squares = np.nonzero(men & ~can_jump)
+            moves[boards, squares] |= CHECKER_STEP_TABLES[is_white][squares] & empty[boards]
+            boards, squares = np.nonzero(kings & ~can_jump)
+            moves[boards, squares] |= KING_STEP_TABLE[squares] & empty[boards]
+            fields = {}
+            for board, sq in zip(*np.nonzero(can_jump)):
+                if board not in fields:
+                    fields[board] = Position.unpack(bytes(self.codes[board]) + bytes(self.counters[board]))
+                for path, taken in PIECES[self.codes[board, sq]].capture_chains(fields[board], sq // 8, sq % 8):
+                    end_r, end_c = path[-1]
+                    moves[board, sq, end_r * 8 + end_c] = True
+                    for over_r, over_c in taken:
+                        self._taken[is_white][board, over_r * 8 + over_c] = True
+        self._moves = moves
+        return moves
+
+    def mobility(self, is_white):
+        side = self.white if is_white else self.black
+        return (self.move_masks() & side[:, :, None]).sum(axis=(1, 2))
+
+    def threats(self, is_white):
+        # То же, что get_threatened_pieces: фигуры соперника под боем стороны is_white
+        # и признак того, что под боем король.
+        side, other = (self.white, self.black) if is_white else (self.black, self.white)
+        reached = (self.move_masks() & side[:, :, None]).any(axis=1)
+        threatened = (reached & other) | self._taken[is_white]
+        king_attacked = (threatened & self.pieces('King', not is_white)).any(axis=1)
+        return threatened, king_attacked
+
+    def evaluate(self, is_white, mobility=MOBILITY_WEIGHT):
+        score = PIECE_SQUARE_SCORE[self.codes, SQUARES].sum(axis=1)
+        if mobility:
+            score = score + mobility * (self.mobility(True) - self.mobility(False))
+        return score if is_white else -score
+
+
+def loop_evaluate(field, is_white, mobility=MOBILITY_WEIGHT):
+    score = evaluate(field, is_white)
+    if mobility:
+        score += mobility * (len(generate_moves(field, is_white)) - len(generate_moves(field, not is_white)))
+    return score
+
+
+def random_positions(variant, count, seed=0, max_plies=40):
+    rng = random.Random(seed)
+    fields = []
+    while len(fields) < count:
+        field = start_position(variant)
+        is_white = True
+        for _ in range(rng.randrange(max_plies)):
+            moves = generate_moves(field, is_white)
+            if not moves or is_king_capture(make_move(field, *rng.choice(moves), promotion='Queen')):
+                break
+            is_white = not is_white
+        fields.append(field)
+    return fields
+
+
+def check(fields, batch):
+    masks = batch.move_masks()
+    scores = batch.evaluate(True)
+    threats = {is_white: batch.threats(is_white) for is_white in (True, False)}
+    mismatches = 0
+    for index, field in enumerate(fields):
+        expected = set()
+        for is_white in (True, False):
+            expected.update(generate_moves(field, is_white))
+        found = {(start >> 3, start & 7, end >> 3, end & 7) for start, end in zip(*np.nonzero(masks[index]))}
+        threats_ok = True
+        for is_white in (True, False):
+            threatened, king_attacked = threats[is_white]
+            squares, king_pos = get_threatened_pieces(field, is_white)
+            threats_ok &= {(sq >> 3, sq & 7) for sq in np.nonzero(threatened[index])[0]} == squares
+            threats_ok &= bool(king_attacked[index]) == (king_pos is not None)
+        if found != expected or not threats_ok or scores[index] != loop_evaluate(field, True):
+            mismatches += 1
+    return mismatches
+
+
+def benchmark(fields):
+    started = time.perf_counter()
+    for field in fields:
+        generate_moves(field, True)
+        generate_moves(field, False)
+        get_threatened_pieces(field, True)
+        get_threatened_pieces(field, False)
+        loop_evaluate(field, True)
+    loop_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    batch = BoardBatch.from_fields(fields)
+    batch.move_masks()
+    batch.threats(True)
+    batch.threats(False)
+    batch.evaluate(True)
+    batch_time = time.perf_counter() - started
+    return loop_time, batch_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Пакетная генерация ходов, угроз и оценки на NumPy')
+    parser.add_argument('--variant', choices=sorted(START_POSITIONS), default='custom')
+    parser.add_argument('--boards', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    fields = random_positions(args.variant, args.boards, args.seed)
+    mismatches = check(fields[:200], BoardBatch.from_fields(fields[:200]))
+    loop_time, batch_time = benchmark(fields)
+    print(f'Вариант: {args.variant}, досок: {len(fields)}, расхождений с классами: {mismatches}')
+    print(f'цикл по классам: {loop_time:.3f} с ({len(fields) / loop_time:.0f} досок/с)')
+    print(f'NumPy:           {batch_time:.3f} с ({len(fields) / batch_time:.0f} досок/с), ускорение {loop_time / batch_time:.1f}x')
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,359 @@
+from functools import wraps
+from .position import FIRST_MOVE, LAST_MOVE_DOUBLE, PIECES, Position
+
+KING_OFFSETS = [(-1,-1), (-1,0), (-1,1), (0,-1), (0,1), (1,-1), (1,0), (1,1)]
+KNIGHT_OFFSETS = [(-2,-1), (-2,1), (-1,-2), (-1,2), (1,-2), (1,2), (2,-1), (2,1)]
+ARCHER_OFFSETS = [(-2,0), (2,0), (0,-2), (0,2), (-2,-2), (-2,2), (2,-2), (2,2)]
+
+ROOK_DIRECTIONS = [(-1,0), (1,0), (0,-1), (0,1)]
+BISHOP_DIRECTIONS = [(-1,-1), (-1,1), (1,-1), (1,1)]
+QUEEN_DIRECTIONS = ROOK_DIRECTIONS + BISHOP_DIRECTIONS
+
+FULL = (1 << 64) - 1
+
+
+def square(row, col):
+    return row * 8 + col
+
+
+def bit(row, col):
+    return 1 << (row * 8 + col)
+
+
+COORDS = [divmod(sq, 8) for sq in range(64)]
+
+
+def squares(mask):
+    result = []
+    while mask:
+        low = mask & -mask
+        result.append(COORDS[low.bit_length() - 1])
+        mask ^= low
+    return result
+
+
+def popcount(mask):
+    return bin(mask).count('1')
+
+
+def _step_table(offsets):
+    table = []
+    for sq in range(64):
+        row, col = divmod(sq, 8)
+        mask = 0
+        for dr, dc in offsets:
+            r, c = row + dr, col + dc
+            if 0 <= r < 8 and 0 <= c < 8:
+                mask |= bit(r, c)
+        table.append(mask)
+    return table
+
+
+def _ray_table(dr, dc):
+    table = []
+    for sq in range(64):
+        row, col = divmod(sq, 8)
+        mask = 0
+        r, c = row + dr, col + dc
+        while 0 <= r < 8 and 0 <= c < 8:
+            mask |= bit(r, c)
+            r, c = r + dr, c + dc
+        table.append(mask)
+    return table
+
+
+KING_ATTACKS = _step_table(KING_OFFSETS)
+KNIGHT_ATTACKS = _step_table(KNIGHT_OFFSETS)
+ARCHER_SHOTS = _step_table(ARCHER_OFFSETS)
+THUNDER_RING = KING_ATTACKS
+
+RAYS = {direction: _ray_table(*direction) for direction in QUEEN_DIRECTIONS}
+# Лучи, идущие в сторону увеличения номера клетки, упираются в младший бит блокеров,
+# остальные - в старший.
+POSITIVE_RAYS = {direction: direction[0] * 8 + direction[1] > 0 for direction in QUEEN_DIRECTIONS}
+
+
+def _checker_table(direction):
+    steps, jumps = [], []
+    for sq in range(64):
+        row, col = divmod(sq, 8)
+        step_mask = 0
+        sq_jumps = []
+        for dc in [-1, 1]:
+            r, c = row + direction, col + dc
+            if 0 <= r < 8 and 0 <= c < 8:
+                step_mask |= bit(r, c)
+                if 0 <= r + direction < 8 and 0 <= c + dc < 8:
+                    sq_jumps.append((bit(r, c), bit(r + direction, c + dc)))
+        steps.append(step_mask)
+        jumps.append(sq_jumps)
+    return steps, jumps
+
+
+CHECKER_STEPS = {True: _checker_table(1)[0], False: _checker_table(-1)[0]}
+CHECKER_JUMPS = {True: _checker_table(1)[1], False: _checker_table(-1)[1]}
+PAWN_PUSHES = {True: _step_table([(1, 0)]), False: _step_table([(-1, 0)])}
+PAWN_NEIGHBOURS = _step_table([(0, -1), (0, 1)])
+
+
+def slide(sq, occupied, directions):
+    attacks = 0
+    for direction in directions:
+        ray = RAYS[direction][sq]
+        blockers = ray & occupied
+        if blockers:
+            if POSITIVE_RAYS[direction]:
+                blocker = (blockers & -blockers).bit_length() - 1
+            else:
+                blocker = blockers.bit_length() - 1
+            ray ^= RAYS[direction][blocker]
+        attacks |= ray
+    return attacks
+
+
+def _king_moves(board, piece, sq, own, enemy):
+    return KING_ATTACKS[sq] & ~own
+
+
+def _knight_moves(board, piece, sq, own, enemy):
+    return KNIGHT_ATTACKS[sq] & ~own
+
+
+def _queen_moves(board, piece, sq, own, enemy):
+    return slide(sq, own | enemy, QUEEN_DIRECTIONS) & ~own
+
+
+def _rook_moves(board, piece, sq, own, enemy):
+    return slide(sq, own | enemy, ROOK_DIRECTIONS) & ~own
+
+
+def _bishop_moves(board, piece, sq, own, enemy):
+    return slide(sq, own | enemy, BISHOP_DIRECTIONS) & ~own
+
+
+def _pawn_moves(board, piece, sq, own, enemy):
+    is_white = piece.is_white
+    pushes = PAWN_PUSHES[is_white]
+    empty = ~(own | enemy)
+    push = pushes[sq] & empty
+    moves = push | CHECKER_STEPS[is_white][sq] & enemy
+    if push and board.counters[sq] & FIRST_MOVE:
+        moves |= pushes[push.bit_length() - 1] & empty
+    if sq >> 3 == (4 if is_white else 3):
+        enemy_pawns = board.masks[PIECE_CODES['Pawn', not is_white]] & PAWN_NEIGHBOURS[sq]
+        while enemy_pawns:
+            low = enemy_pawns & -enemy_pawns
+            enemy_pawns ^= low
+            if board.counters[low.bit_length() - 1] & LAST_MOVE_DOUBLE:
+                moves |= pushes[low.bit_length() - 1]
+    return moves
+
+
+def _wizard_moves(board, piece, sq, own, enemy):
+    moves = slide(sq, own | enemy, BISHOP_DIRECTIONS) & ~own
+    if board.counters[sq] >= 3:
+        moves |= FULL & ~(own | enemy)
+    return moves
+
+
+def _archer_moves(board, piece, sq, own, enemy):
+    return (KING_ATTACKS[sq] & ~own) | (ARCHER_SHOTS[sq] & enemy)
+
+
+def _thunderer_moves(board, piece, sq, own, enemy):
+    moves = slide(sq, own | enemy, ROOK_DIRECTIONS) & ~own
+    if board.counters[sq] >= 4:
+        moves |= THUNDER_RING[sq]
+    return moves
+
+
+# Шашки ходят цепочками взятий, которые зависят от всей доски; их ходы на BitField
+# считает сам класс Checker, а быстрая генерация для шашек - в checkers.py.
+MOVE_GENERATORS = {
+    'King': _king_moves,
+    'Queen': _queen_moves,
+    'Rook': _rook_moves,
+    'Bishop': _bishop_moves,
+    'Knight': _knight_moves,
+    'Pawn': _pawn_moves,
+    'Wizard': _wizard_moves,
+    'Archer': _archer_moves,
+    'Thunderer': _thunderer_moves,
+}
+
+
+class _PieceCodes(dict):
+    # Код фигуры в PIECES по ключу (имя класса, цвет); фигуры - общие экземпляры,
+    # поэтому у каждого ключа ровно один код.
+    def __missing__(self, key):
+        name, is_white = key
+        for code, piece in enumerate(PIECES):
+            if piece != '.' and type(piece).__name__ == name and piece.is_white == is_white:
+                self[key] = code
+                return code
+        raise KeyError(key)
+
+
+PIECE_CODES = _PieceCodes()
+SQUARE_BITS = [[bit(row, col) for col in range(8)] for row in range(8)]
+# Запись в клетку в обход _BitRow.__setitem__ - маски при этом обновляет вызывающий.
+_set_cell = list.__setitem__
+
+
+class _BitRow(list):
+    __slots__ = ('_board', '_bits')
+
+    def __init__(self, board, row, cells):
+        super().__init__(cells)
+        self._board = board
+        self._bits = SQUARE_BITS[row]
+
+    def __setitem__(self, col, value):
+        old = list.__getitem__(self, col)
+        if old is value:
+            return
+        _set_cell(self, col, value)
+        mask = self._bits[col]
+        board = self._board
+        if old != '.':
+            board.masks[old.code] ^= mask
+            board.occupancy[old.is_white] ^= mask
+        if value != '.':
+            board.masks[value.code] ^= mask
+            board.occupancy[value.is_white] ^= mask
+
+
+class BitField(Position):
+    # Маски хранятся по кодам фигур (masks[piece.code]) и по цветам (occupancy[is_white]);
+    # постановка и снятие фигуры - исключающее или с битом клетки.
+    __slots__ = ('occupancy', 'masks')
+
+    def __init__(self, rows=(), counters=None):
+        self.occupancy = [0, 0]
+        self.masks = [0] * len(PIECES)
+        super().__init__(rows, counters)
+
+    def _make_row(self, r, cells):
+        row = _BitRow(self, r, cells)
+        for c, cell in enumerate(row):
+            if cell != '.':
+                self.masks[cell.code] |= bit(r, c)
+                self.occupancy[cell.is_white] |= bit(r, c)
+        return row
+
+    @property
+    def piece_masks(self):
+        return {(type(PIECES[code]).__name__, PIECES[code].is_white): mask
+                for code, mask in enumerate(self.masks) if mask}
+
+    def move_piece(self, start_row, start_col, end_row, end_col):
+        start_cells, end_cells = self[start_row], self[end_row]
+        piece = start_cells[start_col]
+        target = end_cells[end_col]
+        masks, occupancy = self.masks, self.occupancy
+        end_bit = SQUARE_BITS[end_row][end_col]
+        if target != '.':
+            masks[target.code] ^= end_bit
+            occupancy[target.is_white] ^= end_bit
+        _set_cell(end_cells, end_col, piece)
+        _set_cell(start_cells, start_col, '.')
+        path = SQUARE_BITS[start_row][start_col] | end_bit
+        masks[piece.code] ^= path
+        occupancy[piece.is_white] ^= path
+        counters = self.counters
+        counters[end_row * 8 + end_col] = counters[start_row * 8 + start_col]
+        counters[start_row * 8 + start_col] = 0
+
+    def save_state(self):
+        return self.masks[:], self.occupancy[:]
+
+    def restore(self, saved, state=None):
+        if state is None:
+            return self._restore_cells(saved)
+        # Маски до хода сохранены в записи целиком - клетки возвращаются без пересчета масок.
+        self.masks[:], self.occupancy[:] = state
+        counters = self.counters
+        for r, c, old, counter in reversed(saved):
+            _set_cell(self[r], c, old)
+            counters[r * 8 + c] = counter
+
+    def _restore_cells(self, saved):
+        masks, occupancy, counters = self.masks, self.occupancy, self.counters
+        for r, c, old, counter in reversed(saved):
+            cells = self[r]
+            current = cells[c]
+            if current is not old:
+                square_bit = SQUARE_BITS[r][c]
+                if current != '.':
+                    masks[current.code] ^= square_bit
+                    occupancy[current.is_white] ^= square_bit
+                if old != '.':
+                    masks[old.code] ^= square_bit
+                    occupancy[old.is_white] ^= square_bit
+                _set_cell(cells, c, old)
+            counters[r * 8 + c] = counter
+
+    @property
+    def occupied(self):
+        return self.occupancy[True] | self.occupancy[False]
+
+    def pieces(self, name, is_white):
+        return self.masks[PIECE_CODES[name, is_white]]
+
+    def move_mask(self, piece, start_row, start_col):
+        occupancy = self.occupancy
+        return MOVE_GENERATORS[type(piece).__name__](
+            self, piece, start_row * 8 + start_col, occupancy[piece.is_white], occupancy[not piece.is_white])
+
+    def get_valid_moves(self, piece, start_row, start_col):
+        return squares(self.move_mask(piece, start_row, start_col))
+
+    def move_masks(self, is_white):
+        # (клетка, фигура, маска ходов) для всех фигур стороны по возрастанию клеток;
+        # у шашек нет генератора, их маска собирается из цепочек класса.
+        own, enemy = self.occupancy[is_white], self.occupancy[not is_white]
+        result = []
+        remaining = own
+        while remaining:
+            low = remaining & -remaining
+            remaining ^= low
+            sq = low.bit_length() - 1
+            r, c = COORDS[sq]
+            piece = self[r][c]
+            generator = GENERATORS_BY_CODE[piece.code]
+            if generator is not None:
+                mask = generator(self, piece, sq, own, enemy)
+            else:
+                mask = 0
+                for end_r, end_c in piece.get_valid_moves(self, r, c):
+                    mask |= SQUARE_BITS[end_r][end_c]
+            result.append((sq, piece, mask))
+        return result
+
+    def generate_moves(self, is_white):
+        moves = []
+        for sq, piece, mask in self.move_masks(is_white):
+            start = COORDS[sq]
+            while mask:
+                low = mask & -mask
+                mask ^= low
+                moves.append(start + COORDS[low.bit_length() - 1])
+        return moves
+
+
+class _GeneratorsByCode(dict):
+    def __missing__(self, code):
+        generator = self[code] = MOVE_GENERATORS.get(type(PIECES[code]).__name__)
+        return generator
+
+
+GENERATORS_BY_CODE = _GeneratorsByCode()
+
+
+def accelerated(get_valid_moves):
+    @wraps(get_valid_moves)
+    def wrapper(self, field, start_row, start_col):
+        if type(field) is BitField and GENERATORS_BY_CODE[self.code] is not None:
+            return squares(field.move_mask(self, start_row, start_col))
+        return get_valid_moves(self, field, start_row, start_col)
+    return wrapper
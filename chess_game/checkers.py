@@ -0,0 +1,446 @@
+import argparse
+import random
+import sys
+import time
+from .bitboard import popcount
+from .engine import PIECE_VALUES, MATE, MATE_BOUND, SearchResult, SearchTimeout, score_from_table, score_to_table
+from .legal import legal_moves
+from .position import Position
+from .rules import (Checker, CheckerKing, START_POSITIONS, get_threatened_pieces, make_move, parse_position,
+                    print_field)
+from .zobrist import TranspositionTable
+
+# 32 игровых поля: поле i лежит на горизонтали i // 4; на четных горизонталях
+# шашки стоят на нечетных вертикалях, на нечетных - на четных (как в start_field_checkers).
+# Бит i маски - поле i; ход вперед для белых - к старшим битам.
+SQUARES = [(i // 4, 2 * (i % 4) + (i // 4 + 1) % 2) for i in range(32)]
+INDEX = {square: i for i, square in enumerate(SQUARES)}
+LETTERS = 'abcdefgh'
+
+FULL = 0xFFFFFFFF
+EVEN_ROWS = 0x0F0F0F0F
+ODD_ROWS = 0xF0F0F0F0
+LEFT_EDGE = 0x10101010
+RIGHT_EDGE = 0x08080808
+WHITE_CROWN = 0xF0000000
+BLACK_CROWN = 0x0000000F
+ROWS = [0xF << (4 * row) for row in range(8)]
+CENTER = ROWS[2] | ROWS[3] | ROWS[4] | ROWS[5]
+
+MAN_VALUE = PIECE_VALUES['Checker']
+KING_VALUE = PIECE_VALUES['CheckerKing']
+ADVANCE_BONUS = 3
+CENTER_BONUS = 5
+MAX_PLY = 128
+EXACT, LOWER, UPPER = 0, 1, 2
+# Число узлов perft из начальной позиции английских шашек (ход с учетом обязательного
+# взятия и цепочек до конца), по глубинам начиная с нулевой.
+REFERENCE_PERFT = [1, 7, 49, 302, 1469, 7361, 36768, 179740, 845931, 3963680, 18391564, 85242128]
+DEFAULT_PERFT_DEPTH = 7
+
+
+# Сдвиг на соседнее поле по диагонали: из четной горизонтали вверх-влево на 4,
+# вверх-вправо на 5, из нечетной - на 3 и 4; маски отрезают края доски.
+def _up_left(mask):
+    return ((mask & EVEN_ROWS) << 4 | (mask & ODD_ROWS & ~LEFT_EDGE) << 3) & FULL
+
+
+def _up_right(mask):
+    return ((mask & EVEN_ROWS & ~RIGHT_EDGE) << 5 | (mask & ODD_ROWS) << 4) & FULL
+
+
+def _down_left(mask):
+    return (mask & EVEN_ROWS) >> 4 | (mask & ODD_ROWS & ~LEFT_EDGE) >> 5
+
+
+def _down_right(mask):
+    return (mask & EVEN_ROWS & ~RIGHT_EDGE) >> 3 | (mask & ODD_ROWS) >> 4
+
+
+# (шаг, обратный шаг, ходят ли так простые шашки)
+DIRECTIONS = {
+    True: [(_up_left, _down_right, True), (_up_right, _down_left, True),
+           (_down_left, _up_right, False), (_down_right, _up_left, False)],
+    False: [(_down_left, _up_right, True), (_down_right, _up_left, True),
+            (_up_left, _down_right, False), (_up_right, _down_left, False)],
+}
+
+
+def square_name(mask):
+    r, c = SQUARES[mask.bit_length() - 1]
+    return f'{LETTERS[c]}{r + 1}'
+
+
+def field_move(move):
+    start, end, _ = move
+    return SQUARES[start.bit_length() - 1] + SQUARES[end.bit_length() - 1]
+
+
+def move_text(move):
+    start, end, captured = move
+    return f'{square_name(start)}{":" if captured else "-"}{square_name(end)}'
+
+
+def _chains(start, square, is_king, enemy, empty, captured, directions, crown, result):
+    extended = False
+    for step, _, men in directions:
+        if not (men or is_king):
+            continue
+        over = step(square) & enemy & ~captured
+        if not over:
+            continue
+        land = step(over) & empty
+        if not land:
+            continue
+        extended = True
+        if not is_king and land & crown:
+            result[(start, land, captured | over)] = None
+        else:
+            _chains(start, land, is_king, enemy, empty, captured | over, directions, crown, result)
+    if not extended and captured:
+        result[(start, square, captured)] = None
+
+
+class CheckersBoard:
+    __slots__ = ('white', 'black', 'kings', 'white_to_move')
+
+    def __init__(self, white, black, kings=0, white_to_move=True):
+        self.white = white
+        self.black = black
+        self.kings = kings
+        self.white_to_move = white_to_move
+
+    @classmethod
+    def from_field(cls, field, white_to_move=True):
+        white = black = kings = 0
+        for r, row in enumerate(field):
+            for c, piece in enumerate(row):
+                if piece == '.':
+                    continue
+                if not isinstance(piece, Checker) or (r, c) not in INDEX:
+                    raise ValueError(f'{piece} на {LETTERS[c]}{r + 1}: доска шашек держит только шашки на темных полях')
+                bit = 1 << INDEX[(r, c)]
+                if piece.is_white:
+                    white |= bit
+                else:
+                    black |= bit
+                if isinstance(piece, CheckerKing):
+                    kings |= bit
+        return cls(white, black, kings, white_to_move)
+
+    @classmethod
+    def from_text(cls, text, white_to_move=True):
+        return cls.from_field(parse_position(text), white_to_move)
+
+    def to_field(self):
+        rows = [['.'] * 8 for _ in range(8)]
+        for index, (r, c) in enumerate(SQUARES):
+            bit = 1 << index
+            if (self.white | self.black) & bit:
+                piece_class = CheckerKing if self.kings & bit else Checker
+                rows[r][c] = piece_class(bool(self.white & bit))
+        return Position(rows)
+
+    def __eq__(self, other):
+        return (self.white, self.black, self.kings, self.white_to_move) == \
+            (other.white, other.black, other.kings, other.white_to_move)
+
+    def __hash__(self):
+        return hash((self.white, self.black, self.kings, self.white_to_move))
+
+    def key(self):
+        return hash(self) & 0xFFFFFFFFFFFFFFFF
+
+    def moves(self):
+        # Ход - (бит начала, бит конца, маска снятых шашек). Если бить можно, в
+        # списке только взятия, каждое - цепочка, которую нельзя продолжить.
+        if self.white_to_move:
+            own, enemy, crown = self.white, self.black, WHITE_CROWN
+        else:
+            own, enemy, crown = self.black, self.white, BLACK_CROWN
+        directions = DIRECTIONS[self.white_to_move]
+        kings = own & self.kings
+        empty = ~(own | enemy) & FULL
+        jumpers = 0
+        for step, back, men in directions:
+            movers = own if men else kings
+            if movers:
+                jumpers |= movers & back(enemy & back(empty))
+        if jumpers:
+            result = {}
+            while jumpers:
+                low = jumpers & -jumpers
+                jumpers ^= low
+                _chains(low, low, bool(low & kings), enemy, empty | low, 0, directions, crown, result)
+            return list(result)
+        moves = []
+        for step, back, men in directions:
+            targets = step(own if men else kings) & empty
+            while targets:
+                low = targets & -targets
+                targets ^= low
+                moves.append((back(low), low, 0))
+        return moves
+
+    def play(self, move):
+        start, end, captured = move
+        kings = self.kings & ~captured
+        if kings & start:
+            kings = kings & ~start | end
+        elif end & (WHITE_CROWN if self.white_to_move else BLACK_CROWN):
+            kings |= end
+        if self.white_to_move:
+            return CheckersBoard(self.white & ~start | end, self.black & ~captured, kings, False)
+        return CheckersBoard(self.white & ~captured, self.black & ~start | end, kings, True)
+
+    def threats(self):
+        # Шашки соперника, которые сторона, чья очередь, может снять следующим ходом.
+        result = 0
+        for _, _, captured in self.moves():
+            result |= captured
+        return result
+
+    def evaluate(self):
+        white_men, black_men = self.white & ~self.kings, self.black & ~self.kings
+        white_kings, black_kings = self.white & self.kings, self.black & self.kings
+        score = MAN_VALUE * (popcount(white_men) - popcount(black_men))
+        score += KING_VALUE * (popcount(white_kings) - popcount(black_kings))
+        score += CENTER_BONUS * (popcount(white_kings & CENTER) - popcount(black_kings & CENTER))
+        for row, mask in enumerate(ROWS):
+            score += ADVANCE_BONUS * (row * popcount(white_men & mask) - (7 - row) * popcount(black_men & mask))
+        return score if self.white_to_move else -score
+
+
+def perft(board, depth):
+    if depth == 0:
+        return 1
+    moves = board.moves()
+    if depth == 1:
+        return len(moves)
+    return sum(perft(board.play(move), depth - 1) for move in moves)
+
+
+def divide(board, depth):
+    return {move_text(move): perft(board.play(move), depth - 1) for move in board.moves()}
+
+
+class CheckersEngine:
+    # Тот же интерфейс, что у Engine: search и choose_move принимают доску-список
+    # и возвращают ход (строка, столбец, строка, столбец). Взятия обязательны,
+    # поэтому вместо отдельного форсированного перебора позиция со взятием
+    # просто не считается листом.
+    def __init__(self, max_depth=64, time_limit=None, node_limit=None, table_size=1 << 16):
+        self.max_depth = max_depth
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.table = TranspositionTable(table_size)
+        self.nodes = 0
+
+    def reset(self, time_limit=None):
+        self.nodes = 0
+        self.started = time.perf_counter()
+        self.deadline = self.started + time_limit if time_limit else None
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.history = {}
+
+    def search(self, field, is_white, depth=None, moves=None):
+        board = field if isinstance(field, CheckersBoard) else CheckersBoard.from_field(field, is_white)
+        self.reset(self.time_limit)
+        root = board.moves()
+        if moves is not None:
+            allowed = set(moves)
+            root = [move for move in root if field_move(move) in allowed]
+        # Несколько цепочек с одними началом и концом make_move разрешает в пользу
+        # той, что снимает больше шашек; в корне остается только она.
+        best_chains = {}
+        for move in root:
+            chain = best_chains.get(field_move(move))
+            if chain is None or popcount(move[2]) > popcount(chain[2]):
+                best_chains[field_move(move)] = move
+        self._root_moves = list(best_chains.values())
+        if not self._root_moves:
+            return SearchResult(None, -MATE, 0, 0, 0.0)
+        best_move, best_score, completed = self._root_moves[0], 0, 0
+        for current_depth in range(1, (depth or self.max_depth) + 1):
+            try:
+                best_score = self._negamax(board, current_depth, -MATE, MATE, 0)
+            except SearchTimeout:
+                break
+            best_move = self._root_move
+            completed = current_depth
+            if abs(best_score) >= MATE_BOUND:
+                break
+        self.best_move = best_move
+        return SearchResult(field_move(best_move), best_score, completed, self.nodes, time.perf_counter() - self.started)
+
+    def choose_move(self, field, is_white, moves=None):
+        return self.search(field, is_white, moves=moves).move
+
+    def _tick(self):
+        self.nodes += 1
+        if self.node_limit and self.nodes >= self.node_limit:
+            raise SearchTimeout()
+        if self.deadline and not self.nodes & 1023 and time.perf_counter() >= self.deadline:
+            raise SearchTimeout()
+
+    def _order(self, moves, tt_move, ply):
+        killers = self.killers[ply] if ply < MAX_PLY else [None, None]
+        history = self.history
+
+        def priority(move):
+            if move == tt_move:
+                return 1 << 30
+            if move[2]:
+                return (1 << 20) + popcount(move[2])
+            if move in killers:
+                return 1 << 19
+            return history.get(move, 0)
+        return sorted(moves, key=priority, reverse=True)
+
+    def _negamax(self, board, depth, alpha, beta, ply):
+        self._tick()
+        moves = self._root_moves if ply == 0 else board.moves()
+        if not moves:
+            return -MATE + ply
+        if (depth <= 0 and not moves[0][2]) or ply >= MAX_PLY:
+            return board.evaluate()
+
+        alpha_start = alpha
+        tt_move = None
+        key = board.key()
+        entry = self.table.probe(key) if depth > 0 else None
+        if entry is not None:
+            entry_depth, entry_score, entry_flag, tt_move = entry
+            entry_score = score_from_table(entry_score, ply)
+            if ply and entry_depth >= depth:
+                if entry_flag == EXACT:
+                    return entry_score
+                if entry_flag == LOWER:
+                    alpha = max(alpha, entry_score)
+                elif entry_flag == UPPER:
+                    beta = min(beta, entry_score)
+                if alpha >= beta:
+                    return entry_score
+
+        best_score, best_move = -MATE - 1, None
+        for move in self._order(moves, tt_move, ply):
+            score = -self._negamax(board.play(move), depth - 1, -beta, -alpha, ply + 1)
+            if score > best_score:
+                best_score, best_move = score, move
+                if ply == 0:
+                    self._root_move = move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                if not move[2] and ply < MAX_PLY:
+                    killers = self.killers[ply]
+                    if move != killers[0]:
+                        killers[1], killers[0] = killers[0], move
+                    self.history[move] = self.history.get(move, 0) + depth * depth
+                break
+
+        if depth > 0:
+            if best_score <= alpha_start:
+                flag = UPPER
+            elif best_score >= beta:
+                flag = LOWER
+            else:
+                flag = EXACT
+            self.table.store(key, (depth, score_to_table(best_score, ply), flag, best_move), depth)
+        return best_score
+
+
+def verify(games, seed=0, max_plies=200):
+    # Случайные партии, в каждой позиции ходы битборда сравниваются с правилами
+    # классов (LegalMoves), угрозы - с get_threatened_pieces, а доска после хода -
+    # с результатом make_move. Возвращает число проверенных позиций и расхождения.
+    rng = random.Random(seed)
+    positions, mismatches = 0, []
+    for game in range(games):
+        field = parse_position(START_POSITIONS['checkers'])
+        is_white = True
+        for ply in range(max_plies):
+            board = CheckersBoard.from_field(field, is_white)
+            expected = set(legal_moves(field, is_white))
+            found = {field_move(move) for move in board.moves()}
+            threatened = {SQUARES[index] for index in range(32) if board.threats() >> index & 1}
+            positions += 1
+            if found != expected or threatened != get_threatened_pieces(field, is_white)[0]:
+                mismatches.append((game, ply))
+                break
+            if not expected:
+                break
+            move = rng.choice(sorted(expected))
+            chains = [chain for chain in board.moves() if field_move(chain) == move]
+            board = board.play(max(chains, key=lambda chain: popcount(chain[2])))
+            make_move(field, *move)
+            is_white = not is_white
+            if CheckersBoard.from_field(field, is_white) != board:
+                mismatches.append((game, ply))
+                break
+    return positions, mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Шашки на 32-клеточном битборде: perft, поиск и сверка с правилами классов')
+    parser.add_argument('--position', default=START_POSITIONS['checkers'], help='позиция строкой в духе FEN')
+    parser.add_argument('--black', action='store_true', help='ход черных')
+    parser.add_argument('--perft', type=int, metavar='DEPTH', help=f'perft до глубины (по умолчанию {DEFAULT_PERFT_DEPTH})')
+    parser.add_argument('--divide', action='store_true', help='число узлов по каждому первому ходу')
+    parser.add_argument('--search', action='store_true', help='найти лучший ход')
+    parser.add_argument('--depth', type=int, help='глубина поиска')
+    parser.add_argument('--time', type=float, default=5.0, help='секунд на поиск')
+    parser.add_argument('--verify', type=int, metavar='GAMES', help='сверить с правилами классов на случайных партиях')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    try:
+        board = CheckersBoard.from_text(args.position, not args.black)
+    except ValueError as error:
+        parser.error(str(error))
+
+    if args.verify:
+        started = time.perf_counter()
+        positions, mismatches = verify(args.verify, args.seed)
+        print(f'Партий: {args.verify}, позиций: {positions}, расхождений: {len(mismatches)}, '
+              f'{time.perf_counter() - started:.1f} с')
+        for game, ply in mismatches[:10]:
+            print(f'  партия {game}, полуход {ply}')
+        return 1 if mismatches else 0
+
+    if args.search:
+        print_field(board.to_field())
+        engine = CheckersEngine(max_depth=args.depth or 64, time_limit=None if args.depth else args.time)
+        result = engine.search(board, board.white_to_move, depth=args.depth)
+        if result.move is None:
+            print('Ходов нет.')
+            return 0
+        print(f'Ход: {move_text(engine.best_move)}, оценка {result.score}, глубина {result.depth}, '
+              f'узлов {result.nodes}, {result.nps:.0f} узлов/с')
+        return 0
+
+    depth = args.perft or DEFAULT_PERFT_DEPTH
+    if args.divide:
+        counts = divide(board, depth)
+        for move, count in sorted(counts.items()):
+            print(f'  {move}: {count}')
+        print(f'  всего: {sum(counts.values())}')
+        return 0
+
+    reference = REFERENCE_PERFT if args.position == START_POSITIONS['checkers'] and not args.black else []
+    problems = 0
+    print(f'{"глубина":>7} {"узлов":>10} {"время, с":>9} {"узлов/с":>10}')
+    for current in range(1, depth + 1):
+        started = time.perf_counter()
+        nodes = perft(board, current)
+        elapsed = time.perf_counter() - started
+        line = f'{current:>7} {nodes:>10} {elapsed:>9.3f} {nodes / elapsed if elapsed else 0:>10.0f}'
+        if current < len(reference) and nodes != reference[current]:
+            line += f'  ОШИБКА: ожидалось {reference[current]}'
+            problems += 1
+        print(line)
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
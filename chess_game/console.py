@@ -0,0 +1,206 @@
+import argparse
+import atexit
+import os
+import sys
+from . import profiling
+from .bitboard import BitField
+from .checkers import CheckersEngine
+from .engine import Engine
+from .gamelog import GameLog, GameWriter
+from .legal import LegalMoves
+from .tablebase import TABLE_DIR, TablebaseSet
+from .zobrist import TranspositionTable, position_key, update_key
+from .rules import (Checker, start_position, print_field, cached_threats, AttackMap, make_move, unmake_move)
+
+def main_game_loop(field, use_bitboards=False, engines=None, archive=None):
+    if use_bitboards:
+        field = BitField(field)
+    game_on = True
+    step_player_white = True
+    letter_to_num_dict = {'a': 1, 'b': 2, 'c': 3, 'd': 4, 'e': 5, 'f': 6, 'g': 7, 'h': 8}
+    num_to_letter_dict = {0: 'A', 1: 'B', 2: 'C', 3: 'D', 4: 'E', 5: 'F', 6: 'G', 7: 'H'}
+
+    print('Команды:')
+    print('"откат" - откатить ходы')
+    print('"нотация" - прочитать нотацию')
+    print('"stop" - вернуться в меню')
+    print('"угрозы" - показать угрожаемые фигуры')
+    if profiling.enabled():
+        print('"профиль" - показать статистику профилирования')
+
+    attack_map = AttackMap(field)
+    history = []
+    game_log = GameLog(field)
+    keys = [position_key(field, step_player_white)]
+    threat_table = TranspositionTable()
+    while game_on:
+        print_field(field)
+        legal = LegalMoves(field, step_player_white)
+        if legal.is_checkmate:
+            if legal.in_check:
+                print('Мат!')
+            print(f'{"Черные" if step_player_white else "Белые"} выиграли!')
+            game_log.result = 2 if step_player_white else 1
+            game_on = False
+            break
+        if legal.is_stalemate:
+            print('Пат! Ничья.')
+            game_log.result = 3
+            game_on = False
+            break
+        if legal.in_check:
+            print("Ваш король под шахом!")
+
+        engine = engines.get(step_player_white) if engines else None
+        if engine:
+            start_row, start_col, end_row, end_col = engine.choose_move(field, step_player_white, legal.moves)
+            step_coord_figure = f'{num_to_letter_dict[start_col]}{start_row + 1}'
+            step_coord_figure_go = f'{num_to_letter_dict[end_col]}{end_row + 1}'
+            print(f'\nКомпьютер ходит: {step_coord_figure}-{step_coord_figure_go}')
+        else:
+            step_coord_figure = input(f'\nВведите координату {"белой" if step_player_white else "черной"} фигуры: ')
+            step_coord_figure = step_coord_figure.strip('"')
+            if step_coord_figure == 'stop':
+                break
+            if step_coord_figure == 'нотация':
+                print(game_log.notation() or 'Ходов еще не было.')
+                continue
+            if step_coord_figure == 'угрозы':
+                threatened, king_pos = cached_threats(attack_map, threat_table, keys[-1], step_player_white)
+                print_field(field, threatened)
+                if threatened:
+                    threatened_coords = [f"{num_to_letter_dict[c]}{r + 1}" for r, c in threatened]
+                    print(f"Фигура под боем: {', '.join(threatened_coords)}")
+                else:
+                    print("Нет фигур под боем.")
+                continue
+            if step_coord_figure == 'профиль' and profiling.enabled():
+                print(profiling.report())
+                continue
+            if step_coord_figure == 'откат':
+                try:
+                    rollback = int(input('На сколько ходов откатить? '))
+                except ValueError:
+                    print('Некорректный ввод!')
+                    continue
+                for _ in range(min(rollback, len(history))):
+                    record = history.pop()
+                    unmake_move(field, record)
+                    attack_map.update(record.squares)
+                    keys.pop()
+                    game_log.pop()
+                step_player_white = len(history) % 2 == 0
+                continue
+
+            step_coord_figure_go = input('Введите координату хода: ')
+        try:
+            if not engine:
+                start_col = letter_to_num_dict[step_coord_figure[0].lower()] - 1
+                start_row = int(step_coord_figure[1]) - 1
+                end_col = letter_to_num_dict[step_coord_figure_go[0].lower()] - 1
+                end_row = int(step_coord_figure_go[1]) - 1
+
+                if field[start_row][start_col] == '.':
+                    print('Там нет фигуры!')
+                    continue
+                if field[start_row][start_col].is_white != step_player_white:
+                    print('Это не ваша фигура!')
+                    continue
+            
+                moves = field[start_row][start_col].get_valid_moves(field, start_row, start_col)
+                if (end_row, end_col) not in moves:
+                    print('Недопустимый ход!')
+                    continue
+                if (start_row, start_col, end_row, end_col) not in legal.moves:
+                    if isinstance(field[start_row][start_col], Checker):
+                        print('Бить обязательно!')
+                    else:
+                        print('Нельзя оставлять короля под боем!')
+                    continue
+
+            record = make_move(field, start_row, start_col, end_row, end_col, 'Queen' if engine else None)
+            history.append(record)
+            attack_map.update(record.squares)
+            keys.append(update_key(keys[-1], field, record))
+            game_log.append(field, record)
+            step_player_white = not step_player_white
+
+        except (KeyError, ValueError, IndexError):
+            print('Некорректный ввод!')
+            continue
+
+    if archive is not None and len(game_log):
+        archive.write(game_log)
+    return game_on
+
+def choose_engines(tablebases=None, checkers=False):
+    engines = {}
+    for is_white, name in [(True, 'белыми'), (False, 'черными')]:
+        if input(f'Кто играет {name}? (1 - человек, 2 - компьютер): ') == '2':
+            if checkers:
+                engines[is_white] = CheckersEngine(time_limit=ENGINE_TIME_LIMIT)
+            else:
+                engines[is_white] = Engine(time_limit=ENGINE_TIME_LIMIT, tablebases=tablebases)
+    return engines
+
+ENGINE_TIME_LIMIT = 2.0
+GAMES_FILE = 'games.bin'
+PROFILE_FILE = 'profile.jsonl'
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Шахматы, шахматы с новыми фигурами и шашки в консоли')
+    parser.add_argument('--bitboards', action='store_true', help='хранить доску на битбордах')
+    parser.add_argument('--profile', action='store_true', help=f'профилировать игру, снимки в {PROFILE_FILE}')
+    args = parser.parse_args(argv)
+
+    if args.profile:
+        profiling.enable(snapshot_path=PROFILE_FILE)
+        atexit.register(profiling.finish)
+    archive = GameWriter(GAMES_FILE)
+    tablebases = TablebaseSet(TABLE_DIR) if os.path.isdir(TABLE_DIR) else None
+    atexit.register(archive.close)
+    while True:
+        print("\nВыберите игру:")
+        print("1 - Классические шахматы")
+        print("2 - Шахматы с новыми фигурами")
+        print("3 - Шашки")
+        try:
+            choice = input("Ваш выбор (1-3): ")
+        except EOFError:
+            return 0
+
+        if choice == '1':
+            print("\nВы выбрали Классические шахматы.")
+            print("Белые фигуры: R (ладья), N (конь), B (слон), Q (королева), K (король), P (пешка)")
+            print("Черные фигуры: r (ладья), n (конь), b (слон), q (королева), k (король), p (пешка)")
+            main_game_loop(start_position('classic'), args.bitboards, choose_engines(tablebases), archive)
+        elif choice == '2':
+            print("\nВы выбрали Шахматы с новыми фигурами.")
+            print("Белые фигуры: W (волшебник), A (лучник), B (слон), Q (королева), K (король), T (громовержец), R (ладья), P (пешка)")
+            print("Черные фигуры: w (волшебник), a (лучник), b (слон), q (королева), k (король), t (громовержец), r (ладья), p (пешка)")
+            print("\nОписание новых фигур:")
+            print("1. Волшебник (W/w):")
+            print("   - Ходит как слон (по диагонали на любое расстояние), но раз в 3 хода может телепортироваться на любую свободную клетку.")
+            print("   - После телепортации счетчик сбрасывается, после обычного хода увеличивается на 1.")
+            print("   - Телепортация доступна, если счетчик >= 3.")
+            print("2. Лучник (A/a):")
+            print("   - Может перемещаться на 1 клетку в любом направлении, как король (вверх, вниз, влево, вправо и по диагоналям).")
+            print("   - Также может атаковать фигуры противника на расстоянии 2 клеток в любом направлении (по прямой или диагонали), оставаясь на месте.")
+            print("3. Громовержец (T/t):")
+            print("   - Ходит как ладья (по горизонтали или вертикали на любое расстояние).")
+            print("   - Раз в 4 хода может вызвать 'удар грома', атакуя все соседние клетки (8 клеток вокруг), уничтожая фигуры противника, но не перемещаясь.")
+            print("   - После 'удара грома' счетчик сбрасывается, после обычного хода увеличивается на 1.")
+            print("   - 'Удар грома' доступен, если счетчик >= 4.")
+            main_game_loop(start_position('custom'), args.bitboards, choose_engines(tablebases), archive)
+        elif choice == '3':
+            print("\nВы выбрали Шашки.")
+            print("Белые фигуры: C (шашка), D (дамка)")
+            print("Черные фигуры: c (шашка), d (дамка)")
+            print("Бить обязательно; взятие продолжается, пока есть кого бить, шашка на последней горизонтали становится дамкой.")
+            print("Для цепочки взятий введите начальную и конечную клетку.")
+            main_game_loop(start_position('checkers'), args.bitboards, choose_engines(tablebases, checkers=True), archive)
+        else:
+            print("Неверный выбор!")
+
+if __name__ == '__main__':
+    sys.exit(main())
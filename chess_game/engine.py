@@ -0,0 +1,319 @@
+import time
+from copy import deepcopy
+from .bitboard import BitField, COORDS
+from .legal import LegalMoves
+from .position import PIECES
+from .rules import King, Pawn, Checker, Thunderer, AttackMap, make_move, unmake_move
+from .zobrist import TranspositionTable, position_key, update_key
+
+PIECE_VALUES = {
+    'King': 20000, 'Queen': 900, 'Rook': 500, 'Bishop': 330, 'Knight': 320, 'Pawn': 100,
+    'Wizard': 450, 'Archer': 350, 'Thunderer': 550, 'Checker': 100, 'CheckerKing': 160,
+}
+DEFAULT_VALUE = 300
+MATE = 1000000
+MATE_BOUND = MATE - 1000
+MAX_PLY = 128
+QUIESCENCE_DEPTH = 8
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class SearchResult:
+    def __init__(self, move, score, depth, nodes, elapsed):
+        self.move = move
+        self.score = score
+        self.depth = depth
+        self.nodes = nodes
+        self.elapsed = elapsed
+
+    @property
+    def nps(self):
+        return self.nodes / self.elapsed if self.elapsed else 0.0
+
+
+def piece_value(piece):
+    return PIECE_VALUES.get(type(piece).__name__, DEFAULT_VALUE)
+
+
+def generate_moves(field, is_white):
+    if type(field) is BitField:
+        return field.generate_moves(is_white)
+    moves = []
+    for r in range(8):
+        for c in range(8):
+            piece = field[r][c]
+            if piece != '.' and piece.is_white == is_white:
+                for end_r, end_c in sorted(set(piece.get_valid_moves(field, r, c))):
+                    moves.append((r, c, end_r, end_c))
+    return moves
+
+
+def capture_value(field, move):
+    r, c, end_r, end_c = move
+    piece = field[r][c]
+    target = field[end_r][end_c]
+    if target != '.' and target.is_white != piece.is_white:
+        if isinstance(piece, Thunderer) and field.counters[r * 8 + c] >= 4 and abs(end_r - r) <= 1 and abs(end_c - c) <= 1:
+            return _thunder_value(field, piece, r, c)
+        return piece_value(target)
+    if isinstance(piece, Checker) and (abs(end_r - r) != 1 or abs(end_c - c) != 1):
+        chain = piece.chain_to(field, r, c, end_r, end_c)
+        return sum(piece_value(field[over_r][over_c]) for over_r, over_c in chain[1]) if chain else 0
+    if isinstance(piece, Pawn) and c != end_c:
+        return PIECE_VALUES['Pawn']
+    if isinstance(piece, Thunderer) and field.counters[r * 8 + c] >= 4 and abs(end_r - r) <= 1 and abs(end_c - c) <= 1:
+        return _thunder_value(field, piece, r, c)
+    return 0
+
+
+def _thunder_value(field, piece, r, c):
+    total = 0
+    for dr, dc in AttackMap.directions:
+        if 0 <= r + dr < 8 and 0 <= c + dc < 8:
+            target = field[r + dr][c + dc]
+            if target != '.' and target.is_white != piece.is_white:
+                total += piece_value(target)
+    return total
+
+
+def _square_values(name, piece_is_white):
+    value = PIECE_VALUES.get(name, DEFAULT_VALUE)
+    if name in ('Pawn', 'Checker'):
+        return [value + 5 * (r if piece_is_white else 7 - r) for r, c in COORDS]
+    if name == 'King':
+        return [value] * 64
+    return [value + int(6 - abs(3.5 - r) - abs(3.5 - c)) for r, c in COORDS]
+
+
+SQUARE_VALUES = {}
+
+
+def _evaluate_masks(field, is_white):
+    # Та же оценка, что и по клеткам, но по маскам фигур: обходятся только занятые клетки.
+    score = 0
+    for code, mask in enumerate(field.masks):
+        if not mask:
+            continue
+        piece = PIECES[code]
+        values = SQUARE_VALUES.get(code)
+        if values is None:
+            values = SQUARE_VALUES[code] = _square_values(type(piece).__name__, piece.is_white)
+        total = 0
+        while mask:
+            low = mask & -mask
+            mask ^= low
+            total += values[low.bit_length() - 1]
+        score += total if piece.is_white == is_white else -total
+    return score
+
+
+def evaluate(field, is_white):
+    if type(field) is BitField:
+        return _evaluate_masks(field, is_white)
+    score = 0
+    for r in range(8):
+        for c in range(8):
+            piece = field[r][c]
+            if piece == '.':
+                continue
+            value = piece_value(piece)
+            if type(piece) in (Pawn, Checker):
+                value += 5 * (r if piece.is_white else 7 - r)
+            elif not isinstance(piece, King):
+                value += int(6 - abs(3.5 - r) - abs(3.5 - c))
+            score += value if piece.is_white == is_white else -value
+    return score
+
+
+def is_king_capture(record):
+    return any(isinstance(captured, King) for captured in record.captured)
+
+
+def no_moves_score(legal, ply):
+    # Без ходов проигрывает тот, кому шах (или у кого не осталось короля);
+    # без шаха это пат - ничья.
+    return -MATE + ply if legal.is_checkmate else 0
+
+
+def score_to_table(score, ply):
+    # Мат в таблице хранится как расстояние от узла, а не от корня: таблица
+    # переживает поиски и ходы, и та же позиция встречается на другом ply.
+    if score >= MATE_BOUND:
+        return score + ply
+    if score <= -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def score_from_table(score, ply):
+    if score >= MATE_BOUND:
+        return score - ply
+    if score <= -MATE_BOUND:
+        return score + ply
+    return score
+
+
+class Engine:
+    def __init__(self, max_depth=64, time_limit=None, node_limit=None, table_size=1 << 16, tablebases=None):
+        self.max_depth = max_depth
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.table = TranspositionTable(table_size)
+        self.tablebases = tablebases
+        self.nodes = 0
+
+    def reset(self, time_limit=None):
+        self.nodes = 0
+        self.started = time.perf_counter()
+        self.deadline = self.started + time_limit if time_limit else None
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.history = {}
+
+    def search(self, field, is_white, depth=None, moves=None):
+        field = deepcopy(field)
+        self.reset(self.time_limit)
+        key = position_key(field, is_white)
+
+        legal = LegalMoves(field, is_white)
+        if moves is None:
+            moves = legal.moves
+        self._root_moves = moves
+        if not moves:
+            return SearchResult(None, no_moves_score(legal, 0), 0, 0, 0.0)
+        best_move, best_score, completed = self._order(field, moves, None, 0)[0], 0, 0
+        for current_depth in range(1, (depth or self.max_depth) + 1):
+            try:
+                best_score = self._negamax(field, is_white, key, current_depth, -MATE, MATE, 0)
+            except SearchTimeout:
+                break
+            best_move = self._root_move
+            completed = current_depth
+            if abs(best_score) >= MATE_BOUND:
+                break
+        return SearchResult(best_move, best_score, completed, self.nodes, time.perf_counter() - self.started)
+
+    def choose_move(self, field, is_white, moves=None):
+        return self.search(field, is_white, moves=moves).move
+
+    def search_root_move(self, field, is_white, move, depth, alpha=-MATE, beta=MATE):
+        key = position_key(field, is_white)
+        record = make_move(field, *move, promotion='Queen')
+        try:
+            if is_king_capture(record):
+                return MATE
+            return -self._negamax(field, not is_white, update_key(key, field, record), depth - 1, -beta, -alpha, 1)
+        finally:
+            unmake_move(field, record)
+
+    def _tick(self):
+        self.nodes += 1
+        if self.node_limit and self.nodes >= self.node_limit:
+            raise SearchTimeout()
+        if self.deadline and not self.nodes & 1023 and time.perf_counter() >= self.deadline:
+            raise SearchTimeout()
+
+    def _order(self, field, moves, tt_move, ply):
+        killers = self.killers[ply] if ply < MAX_PLY else [None, None]
+        scored = []
+        for move in moves:
+            if move == tt_move:
+                score = 1 << 30
+            else:
+                gain = capture_value(field, move)
+                if gain:
+                    score = (1 << 20) + gain * 16 - piece_value(field[move[0]][move[1]]) // 16
+                elif move in killers:
+                    score = 1 << 19
+                else:
+                    score = self.history.get(move, 0)
+            scored.append((score, move))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [move for _, move in scored]
+
+    def _negamax(self, field, is_white, key, depth, alpha, beta, ply):
+        self._tick()
+        if ply and self.tablebases is not None:
+            score = self.tablebases.score(field, is_white, ply)
+            if score is not None:
+                return score
+        if depth <= 0:
+            return self._quiescence(field, is_white, alpha, beta, ply, 0)
+
+        alpha_start = alpha
+        tt_move = None
+        entry = self.table.probe(key)
+        if entry is not None:
+            entry_depth, entry_score, entry_flag, tt_move = entry
+            entry_score = score_from_table(entry_score, ply)
+            if ply and entry_depth >= depth:
+                if entry_flag == EXACT:
+                    return entry_score
+                if entry_flag == LOWER:
+                    alpha = max(alpha, entry_score)
+                elif entry_flag == UPPER:
+                    beta = min(beta, entry_score)
+                if alpha >= beta:
+                    return entry_score
+
+        if ply == 0:
+            moves = self._root_moves
+        else:
+            legal = LegalMoves(field, is_white)
+            moves = legal.moves
+            if not moves:
+                return no_moves_score(legal, ply)
+        best_score, best_move = -MATE - 1, None
+        for move in self._order(field, moves, tt_move, ply):
+            record = make_move(field, *move, promotion='Queen')
+            if is_king_capture(record):
+                score = MATE - ply
+            else:
+                score = -self._negamax(field, not is_white, update_key(key, field, record), depth - 1, -beta, -alpha, ply + 1)
+            unmake_move(field, record)
+            if score > best_score:
+                best_score, best_move = score, move
+                if ply == 0:
+                    self._root_move = move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                if not record.captured and ply < MAX_PLY:
+                    killers = self.killers[ply]
+                    if move != killers[0]:
+                        killers[1], killers[0] = killers[0], move
+                    self.history[move] = self.history.get(move, 0) + depth * depth
+                break
+
+        if best_score <= alpha_start:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table.store(key, (depth, score_to_table(best_score, ply), flag, best_move), depth)
+        return best_score
+
+    def _quiescence(self, field, is_white, alpha, beta, ply, qdepth):
+        stand_pat = evaluate(field, is_white)
+        if stand_pat >= beta or qdepth >= QUIESCENCE_DEPTH:
+            return stand_pat
+        alpha = max(alpha, stand_pat)
+        captures = [(capture_value(field, move), move) for move in generate_moves(field, is_white)]
+        captures = [(gain, move) for gain, move in captures if gain]
+        captures.sort(key=lambda item: item[0], reverse=True)
+        for _, move in captures:
+            self._tick()
+            record = make_move(field, *move, promotion='Queen')
+            if is_king_capture(record):
+                score = MATE - ply
+            else:
+                score = -self._quiescence(field, not is_white, -beta, -alpha, ply + 1, qdepth + 1)
+            unmake_move(field, record)
+            if score >= beta:
+                return score
+            alpha = max(alpha, score)
+        return alpha
@@ -0,0 +1,227 @@
+import argparse
+import mmap
+import struct
+from .position import PIECES, Position
+from .rules import Pawn, Wizard, Archer, Thunderer, Checker, make_move, print_field
+
+# Формат архива: партии идут подряд, каждая начинается с заголовка
+# (метка, результат, шаг снимков, число полуходов), за ним полуходы
+# по 4 байта и снимки позиции по 128 байт через каждые interval полуходов,
+# начиная с исходной позиции.
+GAME_MAGIC = b'CHG1'
+HEADER = struct.Struct('<4sBHI')
+PLY = struct.Struct('<BBBB')
+SNAPSHOT_SIZE = 128
+SNAPSHOT_INTERVAL = 16
+BATCH_SIZE = 64
+
+CAPTURE = 1
+PROMOTION = 2
+EN_PASSANT = 4
+THUNDER = 8
+SHOT = 16
+JUMP = 32
+TELEPORT = 64
+
+RESULTS = {0: '*', 1: '1-0', 2: '0-1', 3: '1/2-1/2'}
+LETTERS = 'abcdefgh'
+
+
+def square_name(sq):
+    return f'{LETTERS[sq % 8]}{sq // 8 + 1}'
+
+
+def encode_ply(field, record):
+    piece = record.piece
+    start, end = record.start_row * 8 + record.start_col, record.end_row * 8 + record.end_col
+    flags = CAPTURE if record.captured else 0
+    code = piece.code
+    if isinstance(piece, Pawn):
+        if field[record.end_row][record.end_col] is not piece:
+            # Вместо пешки сохраняется фигура, в которую она превратилась.
+            flags |= PROMOTION
+            code = field[record.end_row][record.end_col].code
+        if len(record.saved) > 2:
+            flags |= EN_PASSANT
+    elif isinstance(piece, Thunderer) and len(record.saved) > 2:
+        flags |= THUNDER
+    elif isinstance(piece, Archer) and field[record.start_row][record.start_col] is piece:
+        flags |= SHOT
+    elif isinstance(piece, Checker) and len(record.saved) > 2:
+        flags |= JUMP
+    elif isinstance(piece, Wizard) and field.counters[end] == 0:
+        flags |= TELEPORT
+    return PLY.pack(start, end, code, flags)
+
+
+class GameRecord:
+    def __init__(self, moves, snapshots, interval=SNAPSHOT_INTERVAL, result=0):
+        self.moves = moves
+        self.snapshots = snapshots
+        self.interval = interval
+        self.result = result
+
+    def __len__(self):
+        return len(self.moves) // PLY.size
+
+    def ply(self, index):
+        return PLY.unpack_from(self.moves, index * PLY.size)
+
+    def snapshot(self, index):
+        return Position.unpack(self.snapshots[index * SNAPSHOT_SIZE:(index + 1) * SNAPSHOT_SIZE])
+
+    def position(self, ply=None):
+        ply = len(self) if ply is None else ply
+        if not 0 <= ply <= len(self):
+            raise IndexError(f'В партии {len(self)} полуходов, запрошен {ply}')
+        index = min(ply // self.interval, len(self.snapshots) // SNAPSHOT_SIZE - 1)
+        field = self.snapshot(index)
+        for i in range(index * self.interval, ply):
+            start, end, code, flags = self.ply(i)
+            promotion = type(PIECES[code]).__name__ if flags & PROMOTION else None
+            make_move(field, start // 8, start % 8, end // 8, end % 8, promotion)
+        return field
+
+    def move_text(self, index):
+        start, end, code, flags = self.ply(index)
+        piece = PIECES[code]
+        text = f'{square_name(start)}-{square_name(end)}'
+        if flags & PROMOTION:
+            return f'{"P" if piece.is_white else "p"}{text}={str(piece).upper()}'
+        return f'{piece}{text}'
+
+    def notation(self):
+        lines = []
+        for index in range(0, len(self), 2):
+            moves = ' '.join(self.move_text(i) for i in range(index, min(index + 2, len(self))))
+            lines.append(f'{index // 2 + 1}. {moves}')
+        if self.result:
+            lines.append(RESULTS[self.result])
+        return '\n'.join(lines)
+
+    def to_bytes(self):
+        return HEADER.pack(GAME_MAGIC, self.result, self.interval, len(self)) + bytes(self.moves) + bytes(self.snapshots)
+
+
+class GameLog(GameRecord):
+    def __init__(self, start_field, interval=SNAPSHOT_INTERVAL):
+        super().__init__(bytearray(), bytearray(start_field.pack()), interval)
+
+    def append(self, field, record):
+        self.moves += encode_ply(field, record)
+        if len(self) % self.interval == 0:
+            self.snapshots += field.pack()
+
+    def pop(self):
+        if len(self) % self.interval == 0:
+            del self.snapshots[-SNAPSHOT_SIZE:]
+        del self.moves[-PLY.size:]
+
+
+class GameWriter:
+    def __init__(self, path, batch_size=BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self.pending = []
+        self.written = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, game):
+        self.pending.append(game.to_bytes())
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            with open(self.path, 'ab') as file:
+                file.write(b''.join(self.pending))
+            self.written += len(self.pending)
+            self.pending = []
+
+    def close(self):
+        self.flush()
+
+
+class GameArchive:
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.data = b''
+        self.offsets = []
+        self.scanned = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+    def _scan(self, limit=None):
+        # Индекс смещений строится лениво: заголовок позволяет перескочить
+        # через партию, не читая ее ходов.
+        while self.scanned < len(self.data) and (limit is None or len(self.offsets) <= limit):
+            magic, _, interval, plies = HEADER.unpack_from(self.data, self.scanned)
+            if magic != GAME_MAGIC:
+                raise ValueError(f'Поврежденный архив: смещение {self.scanned}')
+            self.offsets.append(self.scanned)
+            snapshots = plies // interval + 1
+            self.scanned += HEADER.size + plies * PLY.size + snapshots * SNAPSHOT_SIZE
+
+    def __len__(self):
+        self._scan()
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        self._scan(index)
+        if not 0 <= index < len(self.offsets):
+            raise IndexError(index)
+        offset = self.offsets[index]
+        _, result, interval, plies = HEADER.unpack_from(self.data, offset)
+        moves_start = offset + HEADER.size
+        snapshots_start = moves_start + plies * PLY.size
+        snapshots_end = snapshots_start + (plies // interval + 1) * SNAPSHOT_SIZE
+        return GameRecord(self.data[moves_start:snapshots_start], self.data[snapshots_start:snapshots_end], interval, result)
+
+    def __iter__(self):
+        index = 0
+        while True:
+            try:
+                yield self[index]
+            except IndexError:
+                return
+            index += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Просмотр архива партий')
+    parser.add_argument('path')
+    parser.add_argument('--game', type=int, help='номер партии (с нуля)')
+    parser.add_argument('--ply', type=int, help='показать позицию после указанного полухода')
+    args = parser.parse_args()
+
+    with GameArchive(args.path) as archive:
+        if args.game is None:
+            print(f'Партий в архиве: {len(archive)}')
+            return
+        game = archive[args.game]
+        print(game.notation())
+        if args.ply is not None:
+            print_field(game.position(args.ply))
+
+
+if __name__ == '__main__':
+    main()
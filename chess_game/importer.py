@@ -0,0 +1,268 @@
+import argparse
+import os
+import re
+import sys
+import time
+from copy import deepcopy
+from multiprocessing import Pool
+from .gamelog import GameLog, GameWriter
+from .legal import LegalMoves
+from .rules import (King, Queen, Rook, Bishop, Knight, Pawn, Wizard, Archer, Thunderer, Checker, CheckerKing,
+                    START_POSITIONS, start_position, make_move)
+
+VARIANT_TAGS = dict({variant: variant for variant in START_POSITIONS}, standard='classic')
+SAN_PIECES = {'K': King, 'Q': Queen, 'R': Rook, 'B': Bishop, 'N': Knight,
+              'W': Wizard, 'A': Archer, 'T': Thunderer, 'C': Checker, 'D': CheckerKing}
+# В собственной нотации проекта конь записывается как K (так его печатает
+# str), поэтому в полной записи K допускает и короля, и коня, а при
+# превращении K означает коня: превратиться в короля пешка не может.
+LONG_PIECES = dict({letter: (piece_class,) for letter, piece_class in SAN_PIECES.items()}, K=(King, Knight), P=(Pawn,))
+PROMOTIONS = {'Q': 'Queen', 'R': 'Rook', 'B': 'Bishop', 'N': 'Knight', 'K': 'Knight'}
+RESULTS = {'1-0', '0-1', '1/2-1/2', '*'}
+SHARD_GAMES = 500
+
+TAG_RE = re.compile(r'\[(\w+)\s+"((?:[^"\\]|\\.)*)"\]')
+COMMENT_RE = re.compile(r'\{[^}]*\}|;[^\n]*')
+MOVE_NUMBER_RE = re.compile(r'^\d+\.+')
+LONG_RE = re.compile(r'^([A-Za-z])?([a-h][1-8])[-x:]([a-h][1-8])(?:=?([QRBNKqrbnk]))?$')
+SAN_RE = re.compile(r'^([KQRBNWATCD])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([QRBN]))?$')
+CASTLING = {'O-O', 'O-O-O', '0-0', '0-0-0'}
+
+
+class NotationError(Exception):
+    def __init__(self, game, ply, token, reason):
+        super().__init__(f'партия {game}, полуход {ply} ({token}): {reason}')
+        self.game = game
+        self.ply = ply
+        self.token = token
+        self.reason = reason
+
+
+class ImportedGame:
+    def __init__(self, index, offset, headers, log, result, error=None):
+        self.index = index
+        self.offset = offset
+        self.headers = headers
+        self.log = log
+        self.result = result
+        self.error = error
+
+    @property
+    def plies(self):
+        return len(self.log)
+
+
+def _split(file, start=0, end=None):
+    # Граница партии: строка тегов после ходов, первая непустая строка после
+    # результата или строка "1." после пустой строки в записи без тегов.
+    file.seek(start)
+    offset, game_offset, lines = start, None, []
+    seen_moves = finished = after_blank = False
+    for raw in file:
+        line = raw.decode('utf-8', 'replace').strip()
+        if line:
+            starts = game_offset is None or finished or (seen_moves and (
+                line.startswith('[') or (after_blank and line.startswith('1.'))))
+            if starts:
+                if lines:
+                    yield game_offset, lines
+                if end is not None and offset >= end:
+                    return
+                game_offset, lines = offset, []
+                seen_moves = finished = False
+            lines.append(line)
+            if not line.startswith('['):
+                seen_moves = True
+                finished = line.split()[-1] in RESULTS
+        after_blank = not line
+        offset += len(raw)
+    if lines:
+        yield game_offset, lines
+
+
+def game_offsets(file):
+    for offset, _ in _split(file):
+        yield offset
+
+
+def tokenize(lines):
+    text = COMMENT_RE.sub(' ', '\n'.join(line for line in lines if not line.startswith('[')))
+    depth = 0
+    for token in text.replace('(', ' ( ').replace(')', ' ) ').split():
+        if token == '(':
+            depth += 1
+        elif token == ')':
+            depth -= 1
+        elif depth == 0 and not token.startswith('$'):
+            token = MOVE_NUMBER_RE.sub('', token).rstrip('+#!?')
+            if token:
+                yield token
+
+
+def read_games(file, start=0, end=None):
+    for offset, lines in _split(file, start, end):
+        headers = dict(TAG_RE.findall(' '.join(line for line in lines if line.startswith('['))))
+        yield offset, headers, tokenize(lines)
+
+
+def parse_move(field, is_white, token):
+    if token in CASTLING:
+        raise ValueError('рокировка не поддерживается правилами')
+    match = LONG_RE.match(token)
+    if match:
+        letter, start, end, promotion = match.groups()
+        start_row, start_col = int(start[1]) - 1, ord(start[0]) - ord('a')
+        end_row, end_col = int(end[1]) - 1, ord(end[0]) - ord('a')
+        piece = field[start_row][start_col]
+        if piece == '.':
+            raise ValueError(f'на {start} нет фигуры')
+        if piece.is_white != is_white:
+            raise ValueError(f'на {start} фигура соперника')
+        if letter and type(piece) not in LONG_PIECES.get(letter.upper(), ()):
+            raise ValueError(f'на {start} стоит {piece}, а не {letter}')
+        if (end_row, end_col) not in piece.get_valid_moves(field, start_row, start_col):
+            raise ValueError('ход не разрешен правилами фигуры')
+        if (start_row, start_col, end_row, end_col) not in LegalMoves(field, is_white).moves:
+            raise ValueError('бить обязательно' if isinstance(piece, Checker) else 'ход оставляет короля под боем')
+        return start_row, start_col, end_row, end_col, promotion and PROMOTIONS[promotion.upper()]
+
+    match = SAN_RE.match(token)
+    if not match:
+        raise ValueError('нераспознанная запись хода')
+    letter, file_name, rank, end, promotion = match.groups()
+    piece_class = SAN_PIECES[letter] if letter else Pawn
+    end_row, end_col = int(end[1]) - 1, ord(end[0]) - ord('a')
+    candidates = []
+    for r, c, move_end_row, move_end_col in LegalMoves(field, is_white).moves:
+        if (move_end_row, move_end_col) != (end_row, end_col) or type(field[r][c]) is not piece_class:
+            continue
+        if (rank and r != int(rank) - 1) or (file_name and c != ord(file_name) - ord('a')):
+            continue
+        candidates.append((r, c))
+    if not candidates:
+        raise ValueError('нет фигуры, которая может так пойти')
+    if len(candidates) > 1:
+        raise ValueError('неоднозначный ход')
+    start_row, start_col = candidates[0]
+    return start_row, start_col, end_row, end_col, promotion and PROMOTIONS[promotion]
+
+
+def replay(tokens, start_field, game=0):
+    field = deepcopy(start_field)
+    is_white = True
+    ply = 0
+    for token in tokens:
+        if token in RESULTS:
+            return
+        ply += 1
+        try:
+            start_row, start_col, end_row, end_col, promotion = parse_move(field, is_white, token)
+        except ValueError as error:
+            raise NotationError(game, ply, token, str(error)) from None
+        piece = field[start_row][start_col]
+        if isinstance(piece, Pawn) and end_row == (7 if piece.is_white else 0):
+            if not promotion:
+                raise NotationError(game, ply, token, 'не указана фигура для превращения')
+        elif promotion:
+            raise NotationError(game, ply, token, 'превращение без выхода пешки на последнюю горизонталь')
+        record = make_move(field, start_row, start_col, end_row, end_col, promotion)
+        yield token, record, field
+        is_white = not is_white
+
+
+def import_games(file, variant='classic', start=0, end=None, first_index=0):
+    for index, (offset, headers, tokens) in enumerate(read_games(file, start, end), first_index):
+        game_variant = VARIANT_TAGS.get(headers.get('Variant', variant).lower())
+        start_field = start_position(game_variant or variant)
+        tokens = list(tokens)
+        result = tokens[-1] if tokens and tokens[-1] in RESULTS else headers.get('Result', '*')
+        log = GameLog(start_field)
+        error = None
+        if game_variant is None:
+            error = NotationError(index, 0, headers['Variant'], 'неизвестный вариант')
+        elif 'FEN' in headers:
+            error = NotationError(index, 0, headers['FEN'], 'начальная позиция FEN не поддерживается')
+        else:
+            try:
+                for _, record, field in replay(tokens, start_field, index):
+                    log.append(field, record)
+            except NotationError as exc:
+                error = exc
+        log.result = {'1-0': 1, '0-1': 2, '1/2-1/2': 3}.get(result, 0)
+        yield ImportedGame(index, offset, headers, log, result, error)
+
+
+def _summarize(games, keep_logs):
+    count, plies, errors, logs = 0, 0, [], []
+    for game in games:
+        count += 1
+        plies += game.plies
+        if game.error:
+            errors.append(str(game.error))
+        elif keep_logs:
+            logs.append(game.log)
+    return count, plies, errors, logs
+
+
+def _import_task(task):
+    path, start, end, variant, first_index, keep_logs = task
+    with open(path, 'rb') as file:
+        return _summarize(import_games(file, variant, start, end, first_index), keep_logs)
+
+
+def shards(path, variant, keep_logs, shard_games=SHARD_GAMES):
+    with open(path, 'rb') as file:
+        offsets = game_offsets(file)
+        index, start = 0, None
+        for count, offset in enumerate(offsets):
+            if start is None:
+                start = offset
+            elif count % shard_games == 0:
+                yield path, start, offset, variant, index, keep_logs
+                index, start = count, offset
+        if start is not None:
+            yield path, start, None, variant, index, keep_logs
+
+
+def run_import(path, variant='classic', workers=1, keep_logs=False):
+    if workers == 1:
+        with open(path, 'rb') as file:
+            for game in import_games(file, variant):
+                yield _summarize([game], keep_logs)
+        return
+    with Pool(workers) as pool:
+        yield from pool.imap(_import_task, shards(path, variant, keep_logs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Импорт партий из PGN или нотации проекта с проверкой по правилам')
+    parser.add_argument('path')
+    parser.add_argument('--variant', choices=sorted(START_POSITIONS), default='classic',
+                        help='вариант для партий без тега Variant')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--output', help='дописать проверенные партии в двоичный архив')
+    args = parser.parse_args()
+
+    writer = GameWriter(args.output) if args.output else None
+    games = plies = failed = 0
+    started = time.perf_counter()
+    try:
+        for count, spent, errors, logs in run_import(args.path, args.variant, args.workers, writer is not None):
+            games += count
+            plies += spent
+            failed += len(errors)
+            for error in errors:
+                print(f'ОШИБКА: {error}')
+            for log in logs:
+                writer.write(log)
+    finally:
+        if writer is not None:
+            writer.close()
+    elapsed = time.perf_counter() - started
+    print(f'Партий: {games}, с ошибками: {failed}, полуходов: {plies}; '
+          f'{games / elapsed:.1f} партий/с, {plies / elapsed:.0f} полуходов/с', file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
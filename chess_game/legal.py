@@ -0,0 +1,268 @@
+from .bitboard import (BitField, COORDS, KING_ATTACKS, KNIGHT_ATTACKS, ARCHER_SHOTS, THUNDER_RING, CHECKER_STEPS, CHECKER_JUMPS,
+                       RAYS, POSITIVE_RAYS, ROOK_DIRECTIONS, BISHOP_DIRECTIONS, slide)
+
+ROOK_LIKE = ('Rook', 'Queen', 'Thunderer')
+CHECKERS = ('Checker', 'CheckerKing')
+SPECIAL = ('Pawn', 'Archer', 'Thunderer') + CHECKERS
+BISHOP_LIKE = ('Bishop', 'Queen', 'Wizard')
+
+
+def _first(direction, mask):
+    if not mask:
+        return None
+    if POSITIVE_RAYS[direction]:
+        return (mask & -mask).bit_length() - 1
+    return mask.bit_length() - 1
+
+
+def is_special(field, move):
+    # Ходы, которые снимают фигуру не на клетке прихода или оставляют фигуру
+    # на месте; их легальность проверяется пробным ходом.
+    r, c, end_r, end_c = move
+    name = type(field[r][c]).__name__
+    if name == 'Archer':
+        return abs(end_r - r) > 1 or abs(end_c - c) > 1
+    if name in CHECKERS:
+        return abs(end_r - r) != 1 or abs(end_c - c) != 1
+    if name == 'Thunderer':
+        return abs(end_r - r) <= 1 and abs(end_c - c) <= 1 and field.counters[r * 8 + c] >= 4
+    if name == 'Pawn':
+        return c != end_c and field[end_r][end_c] == '.'
+    return False
+
+
+class Attacks:
+    def __init__(self, field):
+        if isinstance(field, BitField):
+            self.pieces = field.piece_masks
+        else:
+            # Фигуры - общие экземпляры на класс и цвет, поэтому клетки сначала
+            # собираются по самим фигурам, а имена разбираются один раз.
+            found = {}
+            sq = 0
+            for row in field:
+                for piece in row:
+                    if piece != '.':
+                        found[piece] = found.get(piece, 0) | 1 << sq
+                    sq += 1
+            self.pieces = {}
+            for piece, mask in found.items():
+                key = (type(piece).__name__, piece.is_white)
+                self.pieces[key] = self.pieces.get(key, 0) | mask
+        self.charged = {True: 0, False: 0}
+        for is_white in (True, False):
+            mask = self.pieces.get(('Thunderer', is_white), 0)
+            while mask:
+                low = mask & -mask
+                mask ^= low
+                if field.counters[low.bit_length() - 1] >= 4:
+                    self.charged[is_white] |= low
+        self._combine()
+
+    def _combine(self):
+        self.sides = {True: 0, False: 0}
+        for (name, is_white), mask in self.pieces.items():
+            self.sides[is_white] |= mask
+        self.occupied = self.sides[True] | self.sides[False]
+        self.rooks = {side: self.mask(ROOK_LIKE, side) for side in (True, False)}
+        self.bishops = {side: self.mask(BISHOP_LIKE, side) for side in (True, False)}
+        self.kings = {}
+        for side in (True, False):
+            kings = self.pieces.get(('King', side), 0)
+            self.kings[side] = (kings & -kings).bit_length() - 1 if kings else None
+
+    def mask(self, names, is_white):
+        result = 0
+        for name in names:
+            result |= self.pieces.get((name, is_white), 0)
+        return result
+
+    def attackers(self, sq, by_white, occupied=None):
+        # Фигуры стороны by_white, которые могут снять фигуру соперника с клетки sq.
+        occupied = self.occupied if occupied is None else occupied
+        get = self.pieces.get
+        result = 0
+        rooks = self.rooks[by_white]
+        if rooks:
+            result |= slide(sq, occupied, ROOK_DIRECTIONS) & rooks
+        bishops = self.bishops[by_white]
+        if bishops:
+            result |= slide(sq, occupied, BISHOP_DIRECTIONS) & bishops
+        archers = get(('Archer', by_white), 0)
+        result |= KNIGHT_ATTACKS[sq] & get(('Knight', by_white), 0)
+        result |= KING_ATTACKS[sq] & (get(('King', by_white), 0) | archers)
+        result |= ARCHER_SHOTS[sq] & archers
+        result |= THUNDER_RING[sq] & self.charged[by_white]
+        # Пешка и шашка бьют по диагонали вперед; клетки, откуда они достают sq,
+        # лежат по диагонали вперед от sq для другого цвета.
+        result |= CHECKER_STEPS[not by_white][sq] & get(('Pawn', by_white), 0)
+        checkers = CHECKER_STEPS[not by_white][sq] & get(('Checker', by_white), 0)
+        while checkers:
+            low = checkers & -checkers
+            checkers ^= low
+            for over, land in CHECKER_JUMPS[by_white][low.bit_length() - 1]:
+                if over == 1 << sq and not occupied & land:
+                    result |= low
+        return result
+
+
+class LegalMoves:
+    def __init__(self, field, is_white):
+        self.field = field
+        self.is_white = is_white
+        self.attacks = attacks = Attacks(field)
+        self.king = king = attacks.kings[is_white]
+        self.checkers = 0
+        self.evasions = ~0
+        self.pins = {}
+        self.screens = 0
+        if king is not None:
+            self._find_checks_and_pins(king)
+        self.moves = self._generate()
+
+    def _find_checks_and_pins(self, king):
+        attacks, is_white = self.attacks, self.is_white
+        own = attacks.sides[is_white]
+        self.checkers = attacks.attackers(king, not is_white)
+        evasions = self.checkers
+        for directions, sliders in ((ROOK_DIRECTIONS, attacks.rooks[not is_white]),
+                                    (BISHOP_DIRECTIONS, attacks.bishops[not is_white])):
+            if not sliders:
+                continue
+            for direction in directions:
+                ray = RAYS[direction][king]
+                first = _first(direction, ray & attacks.occupied)
+                if first is None:
+                    continue
+                if sliders & 1 << first:
+                    evasions |= ray ^ RAYS[direction][first]
+                    continue
+                second = _first(direction, RAYS[direction][first] & attacks.occupied)
+                if second is None or not sliders & 1 << second:
+                    continue
+                if own & 1 << first:
+                    self.pins[first] = ray ^ RAYS[direction][second]
+                else:
+                    self.screens |= 1 << first
+        # Фигура за королем закрывает прыжок шашки: своя может уйти, только взяв
+        # эту шашку, а при шахе от шашки пустую клетку можно занять.
+        checkers = CHECKER_STEPS[is_white][king] & attacks.pieces.get(('Checker', not is_white), 0)
+        while checkers:
+            low = checkers & -checkers
+            checkers ^= low
+            for over, land in CHECKER_JUMPS[not is_white][low.bit_length() - 1]:
+                if over == 1 << king:
+                    land_sq = land.bit_length() - 1
+                    if own & land:
+                        self.pins[land_sq] = self.pins.get(land_sq, ~0) & low
+                    elif attacks.occupied & land:
+                        self.screens |= land
+                    elif self.checkers & low:
+                        evasions |= land
+        if self.checkers:
+            self.evasions = evasions if self.checkers & (self.checkers - 1) == 0 else 0
+
+    def _king_safe(self, end_sq):
+        occupied = self.attacks.occupied & ~(1 << self.king)
+        return not self.attacks.attackers(end_sq, not self.is_white, occupied)
+
+    def _survives(self, move):
+        # Особый ход только снимает фигуры соперника (и, возможно, переставляет
+        # свою), поэтому хватает пересчета занятости без выполнения хода.
+        # Выстрел снимает одну фигуру и опасен, лишь если это заслон; удар
+        # снимает сразу несколько, и заслоны могут стоять друг за другом.
+        r, c, end_r, end_c = move
+        attacks, enemy = self.attacks, not self.is_white
+        name = type(self.field[r][c]).__name__
+        if name == 'Thunderer':
+            removed = THUNDER_RING[r * 8 + c] & attacks.sides[enemy]
+            occupied = attacks.occupied & ~removed
+        elif name == 'Archer':
+            removed = 1 << (end_r * 8 + end_c)
+            if not self.checkers and not removed & self.screens:
+                return True
+            occupied = attacks.occupied & ~removed
+        else:
+            if name in CHECKERS:
+                removed = 0
+                for over_r, over_c in self.field[r][c].chain_to(self.field, r, c, end_r, end_c)[1]:
+                    removed |= 1 << (over_r * 8 + over_c)
+            else:
+                removed = 1 << (r * 8 + end_c)
+            occupied = attacks.occupied & ~removed & ~(1 << (r * 8 + c)) | 1 << (end_r * 8 + end_c)
+        return not attacks.attackers(self.king, enemy, occupied) & ~removed
+
+    def _move_masks(self):
+        if type(self.field) is BitField:
+            return self.field.move_masks(self.is_white)
+        result = []
+        for r, row in enumerate(self.field):
+            for c, piece in enumerate(row):
+                if piece == '.' or piece.is_white != self.is_white:
+                    continue
+                mask = 0
+                for end_r, end_c in piece.get_valid_moves(self.field, r, c):
+                    mask |= 1 << (end_r * 8 + end_c)
+                result.append((r * 8 + c, piece, mask))
+        return result
+
+    def _generate(self):
+        field, king = self.field, self.king
+        evasions, pins = self.evasions, self.pins
+        moves = []
+        for sq, piece, mask in self._move_masks():
+            start = COORDS[sq]
+            special = type(piece).__name__ in SPECIAL
+            if king is not None and sq != king:
+                allowed = evasions & pins.get(sq, ~0)
+                if not special:
+                    mask &= allowed
+            while mask:
+                low = mask & -mask
+                mask ^= low
+                end_sq = low.bit_length() - 1
+                move = start + COORDS[end_sq]
+                if king is None:
+                    moves.append(move)
+                elif sq == king:
+                    if self._king_safe(end_sq):
+                        moves.append(move)
+                elif special and is_special(field, move):
+                    if self._survives(move):
+                        moves.append(move)
+                elif allowed >> end_sq & 1:
+                    moves.append(move)
+        return self._force_captures(moves)
+
+    def _force_captures(self, moves):
+        # Бить шашками обязательно: если хоть одна шашка может взять, тихие ходы шашек запрещены.
+        field = self.field
+        if not self.attacks.mask(CHECKERS, self.is_white):
+            return moves
+        checker_moves = [move for move in moves if type(field[move[0]][move[1]]).__name__ in CHECKERS]
+        if not any(is_special(field, move) for move in checker_moves):
+            return moves
+        return [move for move in moves if type(field[move[0]][move[1]]).__name__ not in CHECKERS or is_special(field, move)]
+
+    @property
+    def in_check(self):
+        return bool(self.checkers)
+
+    @property
+    def is_checkmate(self):
+        return not self.moves and (self.in_check or self.king is None)
+
+    @property
+    def is_stalemate(self):
+        return not self.moves and self.king is not None and not self.in_check
+
+    def status(self):
+        if self.is_checkmate:
+            return 'checkmate'
+        if self.is_stalemate:
+            return 'stalemate'
+        return 'check' if self.in_check else None
+
+
+def legal_moves(field, is_white):
+    return LegalMoves(field, is_white).moves
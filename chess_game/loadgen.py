@@ -0,0 +1,116 @@
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from .rules import START_POSITIONS
+from .server import DEFAULT_PORT, GameServer
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class LoadStats:
+    def __init__(self):
+        self.games = 0
+        self.plies = 0
+        self.errors = 0
+        self.latencies = []
+
+
+async def _client(host, port, variant, engine_side, games, max_plies, rng, stats):
+    reader, writer = await asyncio.open_connection(host, port)
+
+    async def request(line):
+        writer.write((line + '\n').encode('utf-8'))
+        await writer.drain()
+        return (await reader.readline()).decode('utf-8').split()
+
+    try:
+        for _ in range(games):
+            reply = await request(f'new {variant} {engine_side or ""}')
+            game_id = reply[1]
+            stats.plies += len(reply) - 2
+            for _ in range(max_plies):
+                moves = (await request(f'moves {game_id}'))[1:]
+                if not moves:
+                    break
+                start, end = rng.choice(moves).split('-')
+                started = time.perf_counter()
+                reply = await request(f'move {game_id} {start} {end}')
+                stats.latencies.append(time.perf_counter() - started)
+                if reply[0] != 'ok':
+                    stats.errors += 1
+                    break
+                stats.plies += sum('-' in word for word in reply)
+                if 'мат' in reply or 'пат' in reply:
+                    break
+            await request(f'close {game_id}')
+            stats.games += 1
+        writer.write(b'quit\n')
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def run_load(host, port, variant='classic', engine_side=None, games=100, concurrency=10, max_plies=200, seed=0):
+    stats = LoadStats()
+    per_client = [games // concurrency + (index < games % concurrency) for index in range(concurrency)]
+    await asyncio.gather(*(_client(host, port, variant, engine_side, count, max_plies, random.Random(seed + index), stats)
+                           for index, count in enumerate(per_client) if count))
+    return stats
+
+
+async def _serve_and_load(args):
+    # Сервер в том же цикле событий: удобно для быстрого замера одной командой,
+    # но клиенты и сервер делят один процесс.
+    with ProcessPoolExecutor(args.engine_workers) as executor:
+        server = GameServer(executor, args.engine_depth, args.engine_time)
+        listener = await asyncio.start_server(server.handle, args.host, 0, backlog=4096)
+        port = listener.sockets[0].getsockname()[1]
+        async with listener:
+            stats = await run_load(args.host, port, args.variant, args.engine, args.games, args.concurrency,
+                                   args.max_plies, args.seed)
+            while server.connections:
+                await asyncio.sleep(0.01)
+            return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Нагрузочный клиент сервера партий: ходы/с и задержка хода')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--variant', choices=sorted(START_POSITIONS), default='classic')
+    parser.add_argument('--engine', choices=['white', 'black'], help='за какую сторону играет компьютер на сервере')
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=100, help='одновременных соединений')
+    parser.add_argument('--max-plies', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--serve', action='store_true', help='поднять сервер в этом же процессе')
+    parser.add_argument('--engine-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--engine-depth', type=int, default=2)
+    parser.add_argument('--engine-time', type=float, default=0.5)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.serve:
+        stats = asyncio.run(_serve_and_load(args))
+    else:
+        stats = asyncio.run(run_load(args.host, args.port, args.variant, args.engine, args.games, args.concurrency,
+                                     args.max_plies, args.seed))
+    elapsed = time.perf_counter() - started
+    print(f'Партий: {stats.games}, полуходов: {stats.plies}, ошибок: {stats.errors}, '
+          f'соединений: {args.concurrency}, время {elapsed:.1f} с')
+    print(f'{stats.plies / elapsed:.0f} ходов/с, задержка хода p50 {percentile(stats.latencies, 0.5) * 1000:.2f} мс, '
+          f'p99 {percentile(stats.latencies, 0.99) * 1000:.2f} мс')
+    return 1 if stats.errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,179 @@
+import argparse
+import os
+import statistics
+import sys
+import time
+from copy import deepcopy
+from multiprocessing import Pool, get_all_start_methods, get_context
+from .engine import Engine, SearchResult, SearchTimeout, MATE, MATE_BOUND, capture_value, no_moves_score
+from .legal import LegalMoves
+from .rules import START_POSITIONS, start_position
+
+ASPIRATION_WINDOW = 50
+# Бюджет от запуска процесса до первого хода его движка, с.
+SPAWN_BUDGET = 0.25
+SPAWN_DEPTH = 2
+
+_worker_engine = None
+
+
+def _init_worker(table_size):
+    global _worker_engine
+    _worker_engine = Engine(table_size=table_size)
+    _worker_engine.reset()
+
+
+def _search_task(task, engine=None):
+    field, is_white, move, depth, alpha, beta, deadline = task
+    engine = engine or _worker_engine
+    engine.nodes = 0
+    # Срок общий для всех задач итерации и задан родителем, чтобы задачи,
+    # начавшиеся позже, не получали весь оставшийся бюджет заново.
+    engine.deadline = deadline
+    if deadline and time.perf_counter() >= deadline:
+        return None, 0
+    try:
+        score = engine.search_root_move(field, is_white, move, depth, alpha, beta)
+    except SearchTimeout:
+        return None, engine.nodes
+    return score, engine.nodes
+
+
+class ParallelEngine:
+    def __init__(self, workers=None, max_depth=64, time_limit=None, table_size=1 << 16):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_depth = max_depth
+        self.time_limit = time_limit
+        self.table_size = table_size
+        self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    def _run(self, tasks, local_engine):
+        if self.workers == 1:
+            return [_search_task(task, local_engine) for task in tasks]
+        if self.pool is None:
+            self.pool = Pool(self.workers, initializer=_init_worker, initargs=(self.table_size,))
+        return self.pool.map(_search_task, tasks, chunksize=1)
+
+    def search(self, field, is_white, depth=None):
+        field = deepcopy(field)
+        started = time.perf_counter()
+        deadline = started + self.time_limit if self.time_limit else None
+        local_engine = None
+        if self.workers == 1:
+            local_engine = Engine(table_size=self.table_size)
+            local_engine.reset()
+
+        legal = LegalMoves(field, is_white)
+        moves = legal.moves
+        if not moves:
+            return SearchResult(None, no_moves_score(legal, 0), 0, 0, 0.0)
+        order = sorted(moves, key=lambda move: capture_value(field, move), reverse=True)
+        best_move, best_score, completed, nodes = order[0], 0, 0, 0
+        for current_depth in range(1, (depth or self.max_depth) + 1):
+            if current_depth == 1:
+                alpha, beta = -MATE, MATE
+            else:
+                alpha, beta = best_score - ASPIRATION_WINDOW, best_score + ASPIRATION_WINDOW
+            scores, spent, timed_out = self._search_moves(field, is_white, order, current_depth, alpha, beta, deadline, local_engine)
+            nodes += spent
+            if not timed_out:
+                best = max(scores.values())
+                if best <= alpha or best >= beta:
+                    retry = [move for move in order if scores[move] >= beta] or order
+                    rescored, spent, timed_out = self._search_moves(field, is_white, retry, current_depth, -MATE, MATE, deadline, local_engine)
+                    nodes += spent
+                    scores.update(rescored)
+            if timed_out:
+                break
+            order = sorted(order, key=lambda move: scores[move], reverse=True)
+            best_move, best_score, completed = order[0], scores[order[0]], current_depth
+            if abs(best_score) >= MATE_BOUND:
+                break
+        return SearchResult(best_move, best_score, completed, nodes, time.perf_counter() - started)
+
+    def choose_move(self, field, is_white):
+        return self.search(field, is_white).move
+
+    def _search_moves(self, field, is_white, moves, depth, alpha, beta, deadline, local_engine):
+        if deadline and time.perf_counter() >= deadline:
+            return {}, 0, True
+        tasks = [(field, is_white, move, depth, alpha, beta, deadline) for move in moves]
+        results = self._run(tasks, local_engine)
+        scores = {move: score for move, (score, _) in zip(moves, results)}
+        spent = sum(spent for _, spent in results)
+        return scores, spent, any(score is None for score in scores.values())
+
+
+def scaling_report(field, is_white, depth, worker_counts):
+    rows = []
+    base_nps = None
+    for workers in worker_counts:
+        with ParallelEngine(workers=workers) as engine:
+            result = engine.search(field, is_white, depth=depth)
+        base_nps = base_nps or result.nps
+        rows.append((workers, result.nodes, result.elapsed, result.nps, result.nps / base_nps if base_nps else 0.0, result.move))
+    return rows
+
+
+def _first_move(variant, depth):
+    return Engine(max_depth=depth).choose_move(start_position(variant), True)
+
+
+def spawn_latency(method, variant='classic', depth=SPAWN_DEPTH, repeat=5):
+    # Время от создания пула из одного процесса до первого хода в нем:
+    # запуск интерпретатора, импорт модулей и построение начальной позиции.
+    context = get_context(method)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        pool = context.Pool(1)
+        try:
+            pool.apply(_first_move, (variant, depth))
+            timings.append(time.perf_counter() - started)
+        finally:
+            pool.terminate()
+            pool.join()
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Масштабирование параллельного поиска по ядрам')
+    parser.add_argument('--variant', choices=sorted(START_POSITIONS), default='classic')
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--workers', type=int, nargs='+', default=None)
+    parser.add_argument('--spawn-latency', action='store_true',
+                        help='замерить задержку от запуска процесса до первого хода')
+    parser.add_argument('--budget', type=float, default=SPAWN_BUDGET, help='допустимая задержка запуска, с')
+    args = parser.parse_args()
+
+    if args.spawn_latency:
+        over = False
+        for method in get_all_start_methods():
+            latency = spawn_latency(method, args.variant)
+            over = over or latency > args.budget
+            print(f'{method:>10}: {latency * 1000:7.1f} мс{"  ПРЕВЫШЕН БЮДЖЕТ" if latency > args.budget else ""}')
+        return 1 if over else 0
+
+    cpu_count = os.cpu_count() or 1
+    worker_counts = args.workers or sorted({1, 2, 4, 8, cpu_count})
+    print(f'Вариант: {args.variant}, глубина: {args.depth}, ядер: {cpu_count}')
+    print(f'{"процессы":>8} {"узлы":>10} {"время, с":>9} {"узлов/с":>10} {"ускорение":>9}  ход')
+    for workers, nodes, elapsed, nps, speedup, move in scaling_report(start_position(args.variant), True, args.depth, worker_counts):
+        print(f'{workers:>8} {nodes:>10} {elapsed:>9.2f} {nps:>10.0f} {speedup:>9.2f}  {move}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,255 @@
+import argparse
+import json
+import sys
+import time
+from copy import deepcopy
+from . import profiling
+from .bitboard import BitField
+from .engine import generate_moves, is_king_capture
+from .legal import legal_moves
+from .position import LAST_MOVE_DOUBLE, Position
+from .rules import (PIECE_LETTERS, Pawn, start_field_classic, start_field_custom, start_field_checkers,
+                    make_move, unmake_move)
+
+BASELINE_FILE = 'perft_baseline.json'
+PROMOTIONS = ['Queen', 'Rook', 'Bishop', 'Knight']
+LETTERS = 'ABCDEFGH'
+
+
+def build_position(rows, states=None):
+    field = Position([['.' if letter == '.' else PIECE_LETTERS[letter.upper()](letter.isupper()) for letter in row]
+                      for row in rows])
+    for r in range(8):
+        for c in range(8):
+            piece = field[r][c]
+            if isinstance(piece, Pawn) and r != (1 if piece.is_white else 6):
+                field.counters[r * 8 + c] = 0
+    for (r, c), state in (states or {}).items():
+        field.counters[r * 8 + c] = state
+    return field
+
+
+POSITIONS = {
+    'classic-start': (start_field_classic, True, 4),
+    'custom-start': (start_field_custom, True, 3),
+    'checkers-start': (start_field_checkers, True, 6),
+    'pawn-en-passant': (build_position([
+        '....K...',
+        '........',
+        '........',
+        '........',
+        '...pP...',
+        '........',
+        '.....p..',
+        '....k...',
+    ], {(4, 3): LAST_MOVE_DOUBLE}), True, 4),
+    'pawn-promotion': (build_position([
+        '....K...',
+        '........',
+        '.p......',
+        '........',
+        '........',
+        '........',
+        '.P....P.',
+        'r...k..n',
+    ]), True, 4),
+    'wizard-ready': (build_position([
+        '....K...',
+        '........',
+        '..W.....',
+        '........',
+        '....p...',
+        '........',
+        '........',
+        '....k..w',
+    ]), True, 3),
+    'wizard-recharging': (build_position([
+        '....K...',
+        '........',
+        '..W.....',
+        '........',
+        '....p...',
+        '........',
+        '........',
+        '....k..w',
+    ], {(2, 2): 1, (7, 7): 2}), True, 4),
+    'archer-in-range': (build_position([
+        '....K...',
+        '........',
+        '..p.p...',
+        '...A....',
+        '.p...r..',
+        '........',
+        '...a....',
+        '....k...',
+    ]), True, 4),
+    'thunderer-charged': (build_position([
+        '....K...',
+        '........',
+        '..pbn...',
+        '..nT....',
+        '..qrp...',
+        '........',
+        '......t.',
+        '....k...',
+    ], {(6, 6): 2}), True, 4),
+    'checker-jumps': (build_position([
+        '.C.C....',
+        '........',
+        '...C.C..',
+        '..c.c...',
+        '........',
+        '..c...c.',
+        '...c....',
+        '........',
+    ]), True, 6),
+    'checker-kings': (build_position([
+        '...D....',
+        '..c.c...',
+        '........',
+        '..c.c...',
+        '.....C..',
+        '........',
+        '...d....',
+        '........',
+    ]), True, 8),
+}
+
+
+def move_name(move):
+    r, c, end_r, end_c = move
+    return f'{LETTERS[c]}{r + 1}-{LETTERS[end_c]}{end_r + 1}'
+
+
+def expand_promotions(field, move):
+    r, c, end_r, end_c = move
+    piece = field[r][c]
+    if isinstance(piece, Pawn) and end_r == (7 if piece.is_white else 0):
+        return PROMOTIONS
+    return [None]
+
+
+def perft(field, is_white, depth, generator=generate_moves):
+    if depth == 0:
+        return 1
+    nodes = 0
+    for move in generator(field, is_white):
+        for promotion in expand_promotions(field, move):
+            record = make_move(field, *move, promotion=promotion)
+            if depth == 1:
+                nodes += 1
+            elif not is_king_capture(record):
+                nodes += perft(field, not is_white, depth - 1, generator)
+            unmake_move(field, record)
+    return nodes
+
+
+def divide(field, is_white, depth, generator=generate_moves):
+    result = {}
+    for move in generator(field, is_white):
+        for promotion in expand_promotions(field, move):
+            record = make_move(field, *move, promotion=promotion)
+            if depth == 1:
+                count = 1
+            elif is_king_capture(record):
+                count = 0
+            else:
+                count = perft(field, not is_white, depth - 1, generator)
+            unmake_move(field, record)
+            name = move_name(move) + (f'={promotion[0] if promotion != "Knight" else "N"}' if promotion else '')
+            result[name] = count
+    return result
+
+
+def prepare(name, use_bitboards=False):
+    start, is_white, depth = POSITIONS[name]
+    field = deepcopy(start)
+    if use_bitboards:
+        field = BitField(field)
+    return field, is_white, depth
+
+
+def run_suite(names, use_bitboards=False, depth=None, legal=False):
+    generator = legal_moves if legal else generate_moves
+    results = {}
+    for name in names:
+        field, is_white, default_depth = prepare(name, use_bitboards)
+        started = time.perf_counter()
+        nodes = perft(field, is_white, depth or default_depth, generator)
+        elapsed = time.perf_counter() - started
+        results[name] = {'depth': depth or default_depth, 'nodes': nodes, 'seconds': round(elapsed, 4),
+                         'nps': round(nodes / elapsed) if elapsed else 0}
+    return results
+
+
+def compare(results, baseline, tolerance=None):
+    problems = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None or expected['depth'] != result['depth']:
+            continue
+        if expected['nodes'] != result['nodes']:
+            problems.append(f'{name}: число узлов {result["nodes"]}, в базовой линии {expected["nodes"]}')
+        elif tolerance is not None and result['nps'] < expected['nps'] * (1 - tolerance):
+            problems.append(f'{name}: замедление {result["nps"]} узлов/с против {expected["nps"]}')
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Perft: подсчет узлов дерева ходов и контроль регрессий')
+    parser.add_argument('positions', nargs='*', help='позиции (по умолчанию все)')
+    parser.add_argument('--depth', type=int, help='глубина вместо стандартной для позиции')
+    parser.add_argument('--divide', action='store_true', help='вывести число узлов для каждого первого хода')
+    parser.add_argument('--bitboards', action='store_true', help='считать на битбордах')
+    parser.add_argument('--legal', action='store_true', help='считать только легальные ходы (без оставления короля под боем)')
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--update', action='store_true', help='записать результаты в базовую линию')
+    # Скорость в базовой линии зависит от машины, поэтому по умолчанию сверяется только число узлов.
+    parser.add_argument('--check-speed', action='store_true', help='считать замедление против базовой линии ошибкой')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='допустимое замедление (доля) для --check-speed')
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    profiling.start_from_args(args)
+
+    names = args.positions or list(POSITIONS)
+    unknown = [name for name in names if name not in POSITIONS]
+    if unknown:
+        parser.error(f'неизвестные позиции: {", ".join(unknown)}')
+
+    if args.divide:
+        for name in names:
+            field, is_white, depth = prepare(name, args.bitboards)
+            counts = divide(field, is_white, args.depth or depth, legal_moves if args.legal else generate_moves)
+            print(f'{name}:')
+            for move, count in sorted(counts.items()):
+                print(f'  {move}: {count}')
+            print(f'  всего: {sum(counts.values())}')
+        return 0
+
+    results = run_suite(names, args.bitboards, args.depth, args.legal)
+    for name, result in results.items():
+        print(f'{name:<20} глубина {result["depth"]}  узлов {result["nodes"]:>9}  {result["seconds"]:>8.3f} с  {result["nps"]:>8} узлов/с')
+
+    try:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    except FileNotFoundError:
+        baseline = {}
+    section_name = 'bitboards' if args.bitboards else 'lists'
+    section = baseline.setdefault('legal-' + section_name if args.legal else section_name, {})
+    if args.update:
+        section.update(results)
+        with open(args.baseline, 'w') as file:
+            json.dump(baseline, file, indent=2, sort_keys=True)
+            file.write('\n')
+        print(f'Базовая линия записана в {args.baseline}')
+        return 0
+
+    problems = compare(results, section, args.tolerance if args.check_speed else None)
+    for problem in problems:
+        print(f'РЕГРЕССИЯ: {problem}')
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,80 @@
+FIRST_MOVE = 1
+LAST_MOVE_DOUBLE = 2
+
+PIECES = ['.']
+
+
+def register(piece):
+    piece_code = len(PIECES)
+    PIECES.append(piece)
+    return piece_code
+
+
+class Position(list):
+    __slots__ = ('counters',)
+
+    def __init__(self, rows=(), counters=None):
+        super().__init__(self._make_row(r, row) for r, row in enumerate(rows))
+        if counters is None and isinstance(rows, Position):
+            counters = rows.counters
+        if counters is not None:
+            self.counters = bytearray(counters)
+        else:
+            self.counters = bytearray(64)
+            for r, row in enumerate(self):
+                for c, piece in enumerate(row):
+                    if piece != '.':
+                        self.counters[r * 8 + c] = piece.initial_state
+
+    def _make_row(self, r, cells):
+        return list(cells)
+
+    def copy(self):
+        return type(self)(self)
+
+    def __copy__(self):
+        return self.copy()
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+    def __reduce__(self):
+        return type(self), ([list(row) for row in self], bytes(self.counters))
+
+    def state(self, row, col):
+        return self.counters[row * 8 + col]
+
+    def set(self, row, col, piece, counter=None):
+        self[row][col] = piece
+        if counter is None:
+            counter = piece.initial_state if piece != '.' else 0
+        self.counters[row * 8 + col] = counter
+
+    def save_state(self):
+        return None
+
+    def restore(self, saved, state=None):
+        for r, c, old, counter in reversed(saved):
+            self[r][c] = old
+            self.counters[r * 8 + c] = counter
+
+    def move_piece(self, start_row, start_col, end_row, end_col):
+        self[end_row][end_col] = self[start_row][start_col]
+        self[start_row][start_col] = '.'
+        self.counters[end_row * 8 + end_col] = self.counters[start_row * 8 + start_col]
+        self.counters[start_row * 8 + start_col] = 0
+
+    def pack(self):
+        squares = bytearray(64)
+        counters = bytearray(64)
+        for r, row in enumerate(self):
+            for c, piece in enumerate(row):
+                if piece != '.':
+                    squares[r * 8 + c] = piece.code
+                    counters[r * 8 + c] = self.counters[r * 8 + c]
+        return bytes(squares + counters)
+
+    @classmethod
+    def unpack(cls, data):
+        rows = [[PIECES[data[r * 8 + c]] for c in range(8)] for r in range(8)]
+        return cls(rows, data[64:128])
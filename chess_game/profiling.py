@@ -0,0 +1,286 @@
+import atexit
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+from functools import wraps
+
+PIECE_CLASSES = ['King', 'Queen', 'Rook', 'Bishop', 'Knight', 'Pawn', 'Wizard', 'Archer', 'Thunderer', 'Checker']
+# (модуль, функция или Класс.метод, имя счетчика)
+TARGETS = [('rules', f'{name}.get_valid_moves', f'get_valid_moves.{name}') for name in PIECE_CLASSES] + [
+    ('rules', 'get_threatened_pieces', 'get_threatened_pieces'),
+    ('rules', 'AttackMap.threatened_pieces', 'AttackMap.threatened_pieces'),
+    ('rules', 'AttackMap.update', 'AttackMap.update'),
+    ('rules', 'unmake_move', 'unmake_move'),
+    ('rules', 'Checker.capture_chains', 'Checker.capture_chains'),
+    # На битбордах ходы считаются по маскам, мимо get_valid_moves классов фигур.
+    ('bitboard', 'BitField.move_masks', 'bitboard.move_masks'),
+    ('bitboard', 'BitField.generate_moves', 'bitboard.generate_moves'),
+    ('legal', 'LegalMoves.__init__', 'legal_moves'),
+    ('engine', 'Engine.search', 'engine.search'),
+    ('checkers', 'CheckersBoard.moves', 'checkers.moves'),
+    ('checkers', 'CheckersEngine.search', 'checkers.search'),
+    ('gamelog', 'GameRecord.notation', 'io.notation'),
+    ('gamelog', 'GameLog.append', 'io.log_append'),
+    ('gamelog', 'GameWriter.flush', 'io.write'),
+    ('gamelog', 'GameArchive.__getitem__', 'io.read'),
+]
+SAMPLE_INTERVAL = 0.005
+SNAPSHOT_INTERVAL = 10.0
+TOP_SAMPLES = 15
+
+_counters = {}
+_patches = []
+# id обертки -> (обертка, исходная функция) для функций, подмененных в пространствах имен модулей.
+_wrappers = {}
+_sampler = None
+_snapshots = None
+_started = None
+
+
+def enabled():
+    return bool(_patches)
+
+
+def _timed(name, func):
+    counter = _counters.setdefault(name, [0, 0.0])
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            counter[0] += 1
+            counter[1] += time.perf_counter() - started
+    return wrapper
+
+
+def _move_kind(field, record):
+    # Ветки make_move для особых ходов считаются отдельно от обычных ходов фигуры.
+    name = type(record.piece).__name__
+    if len(record.saved) > 2:
+        return name + {'Thunderer': '.thunder', 'Checker': '.jump', 'CheckerKing': '.jump', 'Pawn': '.en_passant'}.get(name, '')
+    if name == 'Archer' and field[record.start_row][record.start_col] is record.piece:
+        return name + '.shot'
+    return name
+
+
+def _timed_make_move(func):
+    @wraps(func)
+    def wrapper(field, *args, **kwargs):
+        started = time.perf_counter()
+        record = func(field, *args, **kwargs)
+        elapsed = time.perf_counter() - started
+        counter = _counters.setdefault('make_move.' + _move_kind(field, record), [0, 0.0])
+        counter[0] += 1
+        counter[1] += elapsed
+        return record
+    return wrapper
+
+
+def _replace_everywhere(original, replacement):
+    # Функции импортируются через from ... import, поэтому подменяются во всех
+    # уже загруженных модулях; модули, загруженные позже, получат обертку,
+    # и disable() найдет ее по _wrappers.
+    _wrappers[id(replacement)] = (replacement, original)
+    for module in list(sys.modules.values()):
+        namespace = getattr(module, '__dict__', None)
+        if not namespace:
+            continue
+        for key, value in list(namespace.items()):
+            if value is original:
+                setattr(module, key, replacement)
+                _patches.append((module, key, original))
+
+
+def _restore_wrappers():
+    # Модули, импортированные при включенном профилировании, тоже держат обертки.
+    for module in list(sys.modules.values()):
+        namespace = getattr(module, '__dict__', None)
+        if not namespace:
+            continue
+        for key, value in list(namespace.items()):
+            wrapper = _wrappers.get(id(value))
+            if wrapper is not None and wrapper[0] is value:
+                setattr(module, key, wrapper[1])
+    _wrappers.clear()
+
+
+def _install():
+    rules = importlib.import_module('.rules', __package__)
+    make_move = rules.make_move
+    _replace_everywhere(make_move, _timed_make_move(make_move))
+    for module_name, path, name in TARGETS:
+        owner = importlib.import_module('.' + module_name, __package__)
+        owner_name, _, attribute = path.rpartition('.')
+        if owner_name:
+            owner = getattr(owner, owner_name)
+            original = owner.__dict__[attribute]
+            setattr(owner, attribute, _timed(name, original))
+            _patches.append((owner, attribute, original))
+        else:
+            original = getattr(owner, attribute)
+            _replace_everywhere(original, _timed(name, original))
+
+
+def enable(sample_interval=None, snapshot_path=None, snapshot_interval=SNAPSHOT_INTERVAL):
+    global _sampler, _snapshots, _started
+    if _patches:
+        return
+    _install()
+    _started = time.perf_counter()
+    if sample_interval:
+        _sampler = Sampler(threading.get_ident(), sample_interval)
+        _sampler.start()
+    if snapshot_path:
+        _snapshots = SnapshotWriter(snapshot_path, snapshot_interval)
+        _snapshots.start()
+
+
+def disable():
+    global _sampler, _snapshots
+    for owner, attribute, original in reversed(_patches):
+        setattr(owner, attribute, original)
+    _patches.clear()
+    _restore_wrappers()
+    if _sampler is not None:
+        _sampler.stop()
+    if _snapshots is not None:
+        _snapshots.stop()
+    _sampler = None
+    _snapshots = None
+
+
+def reset():
+    global _started
+    for counter in _counters.values():
+        counter[0], counter[1] = 0, 0.0
+    if _sampler is not None:
+        _sampler.clear()
+    _started = time.perf_counter()
+
+
+def stats():
+    result = {}
+    for name, (calls, seconds) in sorted(list(_counters.items())):
+        if calls:
+            result[name] = {'calls': calls, 'seconds': round(seconds, 6),
+                            'mean_us': round(seconds / calls * 1e6, 3)}
+    return result
+
+
+def samples(limit=TOP_SAMPLES):
+    if _sampler is None:
+        return {}
+    return _sampler.top(limit)
+
+
+def snapshot():
+    return {'time': time.time(), 'elapsed': round(time.perf_counter() - _started, 3) if _started else 0.0,
+            'stats': stats(), 'samples': samples()}
+
+
+def dump(path):
+    with open(path, 'w') as file:
+        json.dump(snapshot(), file, ensure_ascii=False, indent=2)
+        file.write('\n')
+
+
+def report():
+    lines = [f'{"счетчик":<32} {"вызовов":>10} {"всего, с":>10} {"среднее, мкс":>13}']
+    for name, item in sorted(stats().items(), key=lambda pair: pair[1]['seconds'], reverse=True):
+        lines.append(f'{name:<32} {item["calls"]:>10} {item["seconds"]:>10.3f} {item["mean_us"]:>13.2f}')
+    top = samples()
+    if top:
+        lines.append(f'\nВыборки ({_sampler.total}, доля собственного времени / с вложенными):')
+        for name, (own, inclusive) in top.items():
+            lines.append(f'{name:<48} {own / _sampler.total:>6.1%} {inclusive / _sampler.total:>6.1%}')
+    return '\n'.join(lines)
+
+
+class Sampler(threading.Thread):
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.clear()
+
+    def clear(self):
+        self.total = 0
+        self.own = {}
+        self.inclusive = {}
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.total += 1
+            seen = set()
+            top = True
+            while frame is not None:
+                code = frame.f_code
+                if code.co_filename == __file__:
+                    frame = frame.f_back
+                    continue
+                name = f'{os.path.basename(code.co_filename)}:{code.co_name}'
+                if top:
+                    self.own[name] = self.own.get(name, 0) + 1
+                    top = False
+                if name not in seen:
+                    seen.add(name)
+                    self.inclusive[name] = self.inclusive.get(name, 0) + 1
+                frame = frame.f_back
+
+    def stop(self):
+        self.stopped.set()
+
+    def top(self, limit):
+        own, inclusive = dict(self.own), dict(self.inclusive)
+        names = sorted(own, key=own.get, reverse=True)[:limit]
+        return {name: (own[name], inclusive[name]) for name in names}
+
+
+class SnapshotWriter(threading.Thread):
+    # Раз в interval секунд дописывает снимок счетчиков строкой JSON.
+    def __init__(self, path, interval=SNAPSHOT_INTERVAL):
+        super().__init__(daemon=True)
+        self.path = path
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def write(self):
+        with open(self.path, 'a') as file:
+            file.write(json.dumps(snapshot(), ensure_ascii=False) + '\n')
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.write()
+
+    def stop(self):
+        self.stopped.set()
+        self.write()
+
+
+def add_arguments(parser):
+    parser.add_argument('--profile', action='store_true', help='считать вызовы и время горячих функций')
+    parser.add_argument('--profile-sample', type=float, metavar='SEC',
+                        help='дополнительно снимать стек с заданным интервалом')
+    parser.add_argument('--profile-output', metavar='PATH', help='дописывать снимки счетчиков в JSONL')
+    parser.add_argument('--profile-interval', type=float, default=SNAPSHOT_INTERVAL, help='период снимков, с')
+
+
+def start_from_args(args):
+    if args.profile or args.profile_sample or args.profile_output:
+        enable(args.profile_sample, args.profile_output, args.profile_interval)
+        atexit.register(finish)
+
+
+def finish(stream=None):
+    if enabled():
+        print(report(), file=stream or sys.stderr)
+        disable()
@@ -0,0 +1,626 @@
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from .bitboard import accelerated
+from .position import FIRST_MOVE, LAST_MOVE_DOUBLE, Position, register
+
+class ChessPiece(ABC):
+    __slots__ = ('is_white', 'code')
+    initial_state = 0
+    _flyweights = {}
+
+    def __new__(cls, is_white):
+        piece = ChessPiece._flyweights.get((cls, is_white))
+        if piece is None:
+            piece = super().__new__(cls)
+            object.__setattr__(piece, 'is_white', is_white)
+            object.__setattr__(piece, 'code', register(piece))
+            ChessPiece._flyweights[(cls, is_white)] = piece
+        return piece
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} не изменяется: состояние хранится в Position')
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return type(self), (self.is_white,)
+
+    @abstractmethod
+    def get_valid_moves(self, field, start_row, start_col):
+        pass
+
+    def __str__(self):
+        name = self.__class__.__name__
+        return name[0].upper() if self.is_white else name[0].lower()
+
+class King(ChessPiece):
+    __slots__ = ()
+
+    @accelerated
+    def get_valid_moves(self, field, start_row, start_col):
+        moves = []
+        for dr in [-1, 0, 1]:
+            for dc in [-1, 0, 1]:
+                if dr == 0 and dc == 0:
+                    continue
+                r, c = start_row + dr, start_col + dc
+                if 0 <= r < 8 and 0 <= c < 8 and (field[r][c] == '.' or field[r][c].is_white != self.is_white):
+                    moves.append((r, c))
+        return moves
+
+class Queen(ChessPiece):
+    __slots__ = ()
+
+    @accelerated
+    def get_valid_moves(self, field, start_row, start_col):
+        moves = []
+        directions = [(-1,0), (1,0), (0,-1), (0,1), (-1,-1), (-1,1), (1,-1), (1,1)]
+    
+        for dr, dc in directions:
+            r, c = start_row + dr, start_col + dc
+            while 0 <= r < 8 and 0 <= c < 8:
+                if field[r][c] == '.':
+                    moves.append((r, c))
+                elif field[r][c].is_white != self.is_white:
+                    moves.append((r, c))
+                    break
+                else:
+                    break
+                r, c = r + dr, c + dc
+        return moves
+
+class Bishop(ChessPiece):
+    __slots__ = ()
+
+    @accelerated
+    def get_valid_moves(self, field, start_row, start_col):
+        moves = []
+        directions = [(-1,-1), (-1,1), (1,-1), (1,1)]
+        for dr, dc in directions:
+            r, c = start_row + dr, start_col + dc
+            while 0 <= r < 8 and 0 <= c < 8:
+                if field[r][c] == '.':
+                    moves.append((r, c))
+                elif field[r][c].is_white != self.is_white:
+                    moves.append((r, c))
+                    break
+                else:
+                    break
+                r, c = r + dr, c + dc
+        return moves
+
+class Knight(ChessPiece):
+    __slots__ = ()
+
+    @accelerated
+    def get_valid_moves(self, field, start_row, start_col):
+        moves = []
+        directions = [(-2,-1), (-2,1), (-1,-2), (-1,2), (1,-2), (1,2), (2,-1), (2,1)]
+        for dr, dc in directions:
+            r, c = start_row + dr, start_col + dc
+            if 0 <= r < 8 and 0 <= c < 8 and (field[r][c] == '.' or field[r][c].is_white != self.is_white):
+                moves.append((r, c))
+        return moves
+
+class Rook(ChessPiece):
+    __slots__ = ()
+
+    @accelerated
+    def get_valid_moves(self, field, start_row, start_col):
+        moves = []
+        directions = [(-1,0), (1,0), (0,-1), (0,1)]
+        for dr, dc in directions:
+            r, c = start_row + dr, start_col + dc
+            while 0 <= r < 8 and 0 <= c < 8:
+                if field[r][c] == '.':
+                    moves.append((r, c))
+                elif field[r][c].is_white != self.is_white:
+                    moves.append((r, c))
+                    break
+                else:
+                    break
+                r, c = r + dr, c + dc
+        return moves
+
+class Pawn(ChessPiece):
+    __slots__ = ()
+    initial_state = FIRST_MOVE
+
+    @accelerated
+    def get_valid_moves(self, field, start_row, start_col):
+        moves = []
+        direction = 1 if self.is_white else -1
+        r, c = start_row + direction, start_col
+        
+        if 0 <= r < 8 and field[r][c] == '.':
+            moves.append((r, c))
+            double_r = start_row + 2 * direction
+            if field.counters[start_row * 8 + start_col] & FIRST_MOVE and 0 <= double_r < 8 and field[double_r][c] == '.':
+                moves.append((double_r, c))
+        
+        for dc in [-1, 1]:
+            r, c = start_row + direction, start_col + dc
+            if 0 <= r < 8 and 0 <= c < 8 and field[r][c] != '.' and field[r][c].is_white != self.is_white:
+                moves.append((r, c))
+        
+        if (self.is_white and start_row == 4) or (not self.is_white and start_row == 3):
+            for dc in [-1, 1]:
+                c = start_col + dc
+                if 0 <= c < 8 and isinstance(field[start_row][c], Pawn) and field[start_row][c].is_white != self.is_white and field.counters[start_row * 8 + c] & LAST_MOVE_DOUBLE:
+                    moves.append((start_row + direction, c))
+        
+        return moves
+
+    def move(self, field, start_row, start_col, end_row, end_col, promotion=None):
+        if abs(end_row - start_row) == 2:
+            field.counters[start_row * 8 + start_col] = LAST_MOVE_DOUBLE
+        else:
+            field.counters[start_row * 8 + start_col] = 0
+        
+        if (self.is_white and end_row == 7) or (not self.is_white and end_row == 0):
+            choice = promotion or input("Выберите фигуру для превращения (Queen/Rook/Bishop/Knight): ").capitalize()
+            return globals()[choice](self.is_white)
+        return self
+
+class Wizard(ChessPiece):
+    __slots__ = ()
+    initial_state = 3
+
+    @accelerated
+    def get_valid_moves(self, field, start_row, start_col):
+        moves = []
+        directions = [(-1,-1), (-1,1), (1,-1), (1,1)]
+        for dr, dc in directions:
+            r, c = start_row + dr, start_col + dc
+            while 0 <= r < 8 and 0 <= c < 8:
+                if field[r][c] == '.':
+                    moves.append((r, c))
+                elif field[r][c].is_white != self.is_white:
+                    moves.append((r, c))
+                    break
+                else:
+                    break
+                r, c = r + dr, c + dc
+        
+        if field.counters[start_row * 8 + start_col] >= 3:
+            for r in range(8):
+                for c in range(8):
+                    if field[r][c] == '.':
+                        moves.append((r, c))
+        return moves
+
+    def move(self, field, start_row, start_col, end_row, end_col):
+        index = start_row * 8 + start_col
+        if abs(end_row - start_row) > 2 or abs(end_col - start_col) > 2:
+            field.counters[index] = 0
+        else:
+            field.counters[index] = min(field.counters[index] + 1, 255)
+        return self
+
+class Archer(ChessPiece):
+    __slots__ = ()
+
+    @accelerated
+    def get_valid_moves(self, field, start_row, start_col):
+        moves = []
+        king_directions = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+        for dr, dc in king_directions:
+            r, c = start_row + dr, start_col + dc
+            if 0 <= r < 8 and 0 <= c < 8 and (field[r][c] == '.' or field[r][c].is_white != self.is_white):
+                moves.append((r, c))
+        
+        attack_directions = [(-2, 0), (2, 0), (0, -2), (0, 2), (-2, -2), (-2, 2), (2, -2), (2, 2)]
+        for dr, dc in attack_directions:
+            r, c = start_row + dr, start_col + dc
+            if 0 <= r < 8 and 0 <= c < 8 and field[r][c] != '.' and field[r][c].is_white != self.is_white:
+                moves.append((r, c))
+        return moves
+
+    def move(self, field, start_row, start_col, end_row, end_col):
+        distance_row = abs(end_row - start_row)
+        distance_col = abs(end_col - start_col)
+        if distance_row <= 1 and distance_col <= 1:
+            return self
+        else:
+            field[end_row][end_col] = '.'
+            return self
+
+class Thunderer(ChessPiece):
+    __slots__ = ()
+    initial_state = 4
+
+    @accelerated
+    def get_valid_moves(self, field, start_row, start_col):
+        moves = []
+        directions = [(-1,0), (1,0), (0,-1), (0,1)]
+        for dr, dc in directions:
+            r, c = start_row + dr, start_col + dc
+            while 0 <= r < 8 and 0 <= c < 8:
+                if field[r][c] == '.':
+                    moves.append((r, c))
+                elif field[r][c].is_white != self.is_white:
+                    moves.append((r, c))
+                    break
+                else:
+                    break
+                r, c = r + dr, c + dc
+        
+        if field.counters[start_row * 8 + start_col] >= 4:
+            thunder_directions = [(-1,-1), (-1,0), (-1,1), (0,-1), (0,1), (1,-1), (1,0), (1,1)]
+            for dr, dc in thunder_directions:
+                r, c = start_row + dr, start_col + dc
+                if 0 <= r < 8 and 0 <= c < 8:
+                    moves.append((r, c))
+        return moves
+
+    def move(self, field, start_row, start_col, end_row, end_col):
+        index = start_row * 8 + start_col
+        if abs(end_row - start_row) <= 1 and abs(end_col - start_col) <= 1 and field.counters[index] >= 4:
+            thunder_directions = [(-1,-1), (-1,0), (-1,1), (0,-1), (0,1), (1,-1), (1,0), (1,1)]
+            for dr, dc in thunder_directions:
+                r, c = start_row + dr, start_col + dc
+                if 0 <= r < 8 and 0 <= c < 8 and field[r][c] != '.' and field[r][c].is_white != self.is_white:
+                    field[r][c] = '.'
+            field.counters[index] = 0
+        else:
+            field.counters[index] = min(field.counters[index] + 1, 255)
+        return self
+
+class Checker(ChessPiece):
+    __slots__ = ()
+
+    def directions(self):
+        forward = 1 if self.is_white else -1
+        return [(forward, -1), (forward, 1)]
+
+    def crowned(self, row):
+        return row == (7 if self.is_white else 0)
+
+    def get_valid_moves(self, field, start_row, start_col):
+        # Шашка, которая может бить, обязана бить и проходит цепочку до конца.
+        chains = self.capture_chains(field, start_row, start_col)
+        if chains:
+            return [path[-1] for path, _ in chains]
+        moves = []
+        for dr, dc in self.directions():
+            r, c = start_row + dr, start_col + dc
+            if 0 <= r < 8 and 0 <= c < 8 and field[r][c] == '.':
+                moves.append((r, c))
+        return moves
+
+    def capture_chains(self, field, start_row, start_col):
+        # Все цепочки взятий, которые нельзя продолжить: (клетки приземления, снятые клетки).
+        # Исходная клетка на время хода свободна, снятые фигуры остаются на доске
+        # до конца хода и второй раз не перепрыгиваются; простая шашка, дошедшая
+        # до последней горизонтали, становится дамкой и заканчивает ход.
+        chains = []
+        self._extend(field, (start_row, start_col), start_row, start_col, [], [], chains)
+        return chains
+
+    def _extend(self, field, origin, r, c, path, taken, chains):
+        extended = False
+        for dr, dc in self.directions():
+            over_r, over_c, land_r, land_c = r + dr, c + dc, r + 2 * dr, c + 2 * dc
+            if not (0 <= land_r < 8 and 0 <= land_c < 8) or (over_r, over_c) in taken:
+                continue
+            over = field[over_r][over_c]
+            if over == '.' or over.is_white == self.is_white:
+                continue
+            if field[land_r][land_c] != '.' and (land_r, land_c) != origin:
+                continue
+            extended = True
+            path.append((land_r, land_c))
+            taken.append((over_r, over_c))
+            if self.crowned(land_r):
+                chains.append((list(path), list(taken)))
+            else:
+                self._extend(field, origin, land_r, land_c, path, taken, chains)
+            path.pop()
+            taken.pop()
+        if not extended and path:
+            chains.append((list(path), list(taken)))
+
+    def chain_to(self, field, start_row, start_col, end_row, end_col):
+        # Если в клетку ведут разные цепочки, ход снимает больше фигур.
+        chains = [chain for chain in self.capture_chains(field, start_row, start_col) if chain[0][-1] == (end_row, end_col)]
+        return max(chains, key=lambda chain: len(chain[1])) if chains else None
+
+    def move(self, field, start_row, start_col, end_row, end_col):
+        return CheckerKing(self.is_white) if self.crowned(end_row) else self
+
+class CheckerKing(Checker):
+    __slots__ = ()
+
+    def directions(self):
+        return [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+
+    def crowned(self, row):
+        return False
+
+    def __str__(self):
+        return 'D' if self.is_white else 'd'
+
+for piece_class in (King, Queen, Rook, Bishop, Knight, Pawn, Wizard, Archer, Thunderer, Checker, CheckerKing):
+    piece_class(True)
+    piece_class(False)
+
+PIECE_LETTERS = {'K': King, 'Q': Queen, 'R': Rook, 'B': Bishop, 'N': Knight, 'P': Pawn,
+                 'W': Wizard, 'A': Archer, 'T': Thunderer, 'C': Checker, 'D': CheckerKing}
+LETTERS = {piece_class: letter for letter, piece_class in PIECE_LETTERS.items()}
+# Горизонтали от 8-й к 1-й, как в FEN; заглавные буквы - белые, конь - N,
+# дамка - D, цифра - несколько пустых клеток подряд, точка - одна пустая клетка.
+START_POSITIONS = {
+    'classic': 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR',
+    'custom': 'wabqkbtr/pppppppp/8/8/8/8/PPPPPPPP/WABQKBTR',
+    'checkers': 'c1c1c1c1/1c1c1c1c/c1c1c1c1/8/8/1C1C1C1C/C1C1C1C1/1C1C1C1C',
+}
+_START_FIELDS = {'start_field_classic': 'classic', 'start_field_custom': 'custom', 'start_field_checkers': 'checkers'}
+
+
+def parse_position(text):
+    ranks = text.split()[0].split('/')
+    if len(ranks) != 8:
+        raise ValueError(f'Нужно 8 горизонталей, получено {len(ranks)}')
+    rows = []
+    for rank in reversed(ranks):
+        row = []
+        for letter in rank:
+            if letter.isdigit():
+                row.extend('.' * int(letter))
+            elif letter == '.':
+                row.append('.')
+            elif letter.upper() in PIECE_LETTERS:
+                row.append(PIECE_LETTERS[letter.upper()](letter.isupper()))
+            else:
+                raise ValueError(f'Неизвестная фигура {letter}')
+        if len(row) != 8:
+            raise ValueError(f'Нужно 8 клеток на горизонтали, получено {len(row)}: {rank}')
+        rows.append(row)
+    field = Position(rows)
+    for r, row in enumerate(field):
+        for c, piece in enumerate(row):
+            if isinstance(piece, Pawn) and r != (1 if piece.is_white else 6):
+                field.counters[r * 8 + c] = 0
+    return field
+
+
+def position_text(field):
+    ranks = []
+    for row in reversed(field):
+        rank, empty = '', 0
+        for piece in row:
+            if piece == '.':
+                empty += 1
+                continue
+            if empty:
+                rank, empty = rank + str(empty), 0
+            letter = LETTERS[type(piece)]
+            rank += letter if piece.is_white else letter.lower()
+        ranks.append(rank + (str(empty) if empty else ''))
+    return '/'.join(ranks)
+
+
+@lru_cache(maxsize=None)
+def _start_template(variant):
+    return parse_position(START_POSITIONS[variant])
+
+
+def start_position(variant):
+    return _start_template(variant).copy()
+
+
+def __getattr__(name):
+    # Старые имена start_field_* собираются при первом обращении, а не при импорте;
+    # каждое обращение дает свою копию, чтобы изменения не портили шаблон.
+    if name in _START_FIELDS:
+        return start_position(_START_FIELDS[name])
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+def print_field(field, threatened=None):
+    threatened = threatened or set()
+    letters_coords = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H']
+    nums_coords = [i for i in range(1, 9)]
+    print('    ', *letters_coords, sep=' ', end='\n\n')
+    for i in range(len(field)):
+        print(nums_coords[i], end='    ')
+        for j in range(8):
+            if (i, j) in threatened:
+                print(f'[{field[i][j]}]', end=' ')
+            else:
+                print(f'{field[i][j]}', end=' ')
+        print('  ', nums_coords[i])
+    print('\n    ', *letters_coords, sep=' ')
+
+def get_threatened_pieces(field, is_white_turn):
+    threatened = set()
+    king_pos = None
+    for r in range(8):
+        for c in range(8):
+            if field[r][c] != '.' and field[r][c].is_white == is_white_turn:
+                if isinstance(field[r][c], Checker):
+                    for _, taken in field[r][c].capture_chains(field, r, c):
+                        threatened.update(taken)
+                    continue
+                moves = field[r][c].get_valid_moves(field, r, c)
+                for move_r, move_c in moves:
+                    if field[move_r][move_c] != '.' and field[move_r][move_c].is_white != is_white_turn:
+                        threatened.add((move_r, move_c))
+                        if isinstance(field[move_r][move_c], King):
+                            king_pos = (move_r, move_c)
+    return threatened, king_pos
+
+def cached_threats(attack_map, table, key, is_white_turn):
+    threats = table.probe(key)
+    if threats is None:
+        threats = attack_map.threatened_pieces(is_white_turn)
+        table.store(key, threats)
+    return threats
+
+class AttackMap:
+    directions = [(-1,-1), (-1,0), (-1,1), (0,-1), (0,1), (1,-1), (1,0), (1,1)]
+    far_reaching = (Knight, Pawn, Archer)
+
+    def __init__(self, field):
+        self.field = field
+        self.threats = {}
+        self.counts = {True: {}, False: {}}
+        # Цепочка взятий шашки может пройти через всю доску, поэтому шашки
+        # пересчитываются после любого хода.
+        self.checkers = set()
+        for r in range(8):
+            for c in range(8):
+                self._refresh(r, c)
+
+    def _piece_threats(self, r, c):
+        field = self.field
+        piece = field[r][c]
+        hits = set()
+        if isinstance(piece, Checker):
+            for _, taken in piece.capture_chains(field, r, c):
+                hits.update(taken)
+            return hits
+        for move_r, move_c in piece.get_valid_moves(field, r, c):
+            target = field[move_r][move_c]
+            if target != '.' and target.is_white != piece.is_white:
+                hits.add((move_r, move_c))
+        return hits
+
+    def _count(self, is_white, squares, delta):
+        counts = self.counts[is_white]
+        for square in squares:
+            counts[square] = counts.get(square, 0) + delta
+            if not counts[square]:
+                del counts[square]
+
+    def _refresh(self, r, c):
+        piece = self.field[r][c]
+        old = self.threats.pop((r, c), None)
+        new = None
+        if isinstance(piece, Checker):
+            self.checkers.add((r, c))
+        else:
+            self.checkers.discard((r, c))
+        if piece != '.':
+            new = (piece.is_white, self._piece_threats(r, c))
+            self.threats[(r, c)] = new
+        if old is not None and new is not None and old[0] == new[0]:
+            self._count(old[0], old[1] - new[1], -1)
+            self._count(new[0], new[1] - old[1], 1)
+            return
+        if old is not None:
+            self._count(old[0], old[1], -1)
+        if new is not None:
+            self._count(new[0], new[1], 1)
+
+    def _dependents(self, r, c):
+        field = self.field
+        dependents = {(r, c)}
+        for near_r in range(max(r - 2, 0), min(r + 3, 8)):
+            for near_c in range(max(c - 2, 0), min(c + 3, 8)):
+                piece = field[near_r][near_c]
+                if piece == '.':
+                    continue
+                if abs(near_r - r) <= 1 and abs(near_c - c) <= 1 or isinstance(piece, self.far_reaching):
+                    dependents.add((near_r, near_c))
+        for dr, dc in self.directions:
+            ray_r, ray_c = r + dr, c + dc
+            while 0 <= ray_r < 8 and 0 <= ray_c < 8:
+                if field[ray_r][ray_c] != '.':
+                    dependents.add((ray_r, ray_c))
+                    break
+                ray_r, ray_c = ray_r + dr, ray_c + dc
+        return dependents
+
+    def update(self, changed):
+        dirty = set(self.checkers)
+        for r, c in changed:
+            dirty |= self._dependents(r, c)
+        for r, c in dirty:
+            self._refresh(r, c)
+
+    def threatened_pieces(self, is_white_turn):
+        threatened = set(self.counts[is_white_turn])
+        king_pos = None
+        for r, c in threatened:
+            if isinstance(self.field[r][c], King):
+                king_pos = (r, c)
+        return threatened, king_pos
+
+class MoveRecord:
+    __slots__ = ('start_row', 'start_col', 'end_row', 'end_col', 'piece', 'saved', 'state', 'captured')
+
+    def __init__(self, start_row, start_col, end_row, end_col, piece, saved, state=None):
+        self.start_row = start_row
+        self.start_col = start_col
+        self.end_row = end_row
+        self.end_col = end_col
+        self.piece = piece
+        self.saved = saved
+        self.state = state
+        self.captured = []
+
+    @property
+    def squares(self):
+        return [(r, c) for r, c, _, _ in self.saved]
+
+def make_move(field, start_row, start_col, end_row, end_col, promotion=None):
+    piece = field[start_row][start_col]
+    touched = [(start_row, start_col), (end_row, end_col)]
+    adjacent = abs(end_row - start_row) <= 1 and abs(end_col - start_col) <= 1
+    thunder = isinstance(piece, Thunderer) and adjacent and field.counters[start_row * 8 + start_col] >= 4
+    # Ход шашки не на соседнюю клетку - цепочка взятий (дамка может вернуться на исходную клетку).
+    chain = None
+    if isinstance(piece, Checker) and not (abs(end_row - start_row) == 1 and abs(end_col - start_col) == 1):
+        chain = piece.chain_to(field, start_row, start_col, end_row, end_col)
+    en_passant = isinstance(piece, Pawn) and abs(start_col - end_col) == 1 and field[end_row][end_col] == '.'
+    if chain:
+        touched.extend(chain[1])
+    elif thunder:
+        touched.extend((start_row + dr, start_col + dc) for dr, dc in AttackMap.directions
+                       if 0 <= start_row + dr < 8 and 0 <= start_col + dc < 8 and (start_row + dr, start_col + dc) != (end_row, end_col))
+    elif en_passant:
+        touched.append((start_row, end_col))
+    counters = field.counters
+    record = MoveRecord(start_row, start_col, end_row, end_col, piece, [(r, c, field[r][c], counters[r * 8 + c]) for r, c in touched],
+                        field.save_state())
+
+    if chain:
+        for r, c in chain[1]:
+            field[r][c] = '.'
+        new_piece = piece.move(field, start_row, start_col, end_row, end_col)
+        if (end_row, end_col) != (start_row, start_col):
+            field.move_piece(start_row, start_col, end_row, end_col)
+        if new_piece is not piece:
+            field.set(end_row, end_col, new_piece)
+    elif isinstance(piece, Archer):
+        piece.move(field, start_row, start_col, end_row, end_col)
+        if adjacent:
+            field.move_piece(start_row, start_col, end_row, end_col)
+    elif isinstance(piece, Thunderer):
+        piece.move(field, start_row, start_col, end_row, end_col)
+        if not thunder:
+            field.move_piece(start_row, start_col, end_row, end_col)
+    else:
+        if en_passant:
+            field[start_row][end_col] = '.'
+        if isinstance(piece, Pawn):
+            new_piece = piece.move(field, start_row, start_col, end_row, end_col, promotion)
+        elif hasattr(piece, 'move'):
+            new_piece = piece.move(field, start_row, start_col, end_row, end_col)
+        else:
+            new_piece = piece
+        field.move_piece(start_row, start_col, end_row, end_col)
+        if new_piece is not piece:
+            field.set(end_row, end_col, new_piece)
+
+    for r, c, old, _ in record.saved[1:]:
+        if old != '.' and field[r][c] is not old:
+            record.captured.append(old)
+    return record
+
+def unmake_move(field, record):
+    field.restore(record.saved, record.state)
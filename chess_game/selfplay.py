@@ -0,0 +1,176 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from multiprocessing import Pool
+from . import profiling
+from .checkers import CheckersEngine
+from .engine import Engine, capture_value, evaluate
+from .legal import LegalMoves
+from .rules import START_POSITIONS, start_position, make_move, unmake_move
+
+LETTERS = 'ABCDEFGH'
+BATCH_SIZE = 256
+
+
+def move_name(move):
+    r, c, end_r, end_c = move
+    return f'{LETTERS[c]}{r + 1}-{LETTERS[end_c]}{end_r + 1}'
+
+
+class RandomPolicy:
+    def __init__(self, rng):
+        self.rng = rng
+
+    def choose(self, field, is_white, moves):
+        return self.rng.choice(moves)
+
+
+class GreedyPolicy:
+    def __init__(self, rng):
+        self.rng = rng
+
+    def choose(self, field, is_white, moves):
+        best_score, best_moves = None, []
+        for move in moves:
+            record = make_move(field, *move, promotion='Queen')
+            score = float('inf') if LegalMoves(field, not is_white).is_checkmate else evaluate(field, is_white)
+            unmake_move(field, record)
+            if best_score is None or score > best_score:
+                best_score, best_moves = score, [move]
+            elif score == best_score:
+                best_moves.append(move)
+        return self.rng.choice(best_moves)
+
+
+class CapturePolicy:
+    def __init__(self, rng):
+        self.rng = rng
+
+    def choose(self, field, is_white, moves):
+        gains = [capture_value(field, move) for move in moves]
+        best = max(gains)
+        return self.rng.choice([move for move, gain in zip(moves, gains) if gain == best])
+
+
+class EnginePolicy:
+    def __init__(self, rng, depth, engine_class=Engine):
+        self.depth = depth
+        self.engine = engine_class(max_depth=depth)
+
+    def choose(self, field, is_white, moves):
+        return self.engine.search(field, is_white, depth=self.depth, moves=moves).move
+
+
+def make_policy(spec, rng, variant=None):
+    name, _, argument = spec.partition(':')
+    if name == 'random':
+        return RandomPolicy(rng)
+    if name == 'greedy':
+        return GreedyPolicy(rng)
+    if name == 'capture':
+        return CapturePolicy(rng)
+    if name == 'engine':
+        return EnginePolicy(rng, int(argument or 2), CheckersEngine if variant == 'checkers' else Engine)
+    raise ValueError(f'Неизвестная стратегия: {spec}')
+
+
+def play_game(variant, white_spec, black_spec, seed, max_plies=300):
+    rng = random.Random(seed)
+    policies = {True: make_policy(white_spec, rng, variant), False: make_policy(black_spec, rng, variant)}
+    field = start_position(variant)
+    is_white = True
+    moves_played = []
+    result, reason = '1/2-1/2', 'max_plies'
+    started = time.perf_counter()
+    while len(moves_played) < max_plies:
+        legal = LegalMoves(field, is_white)
+        if legal.is_stalemate:
+            result, reason = '1/2-1/2', 'stalemate'
+            break
+        if legal.is_checkmate:
+            result, reason = ('0-1' if is_white else '1-0'), 'checkmate' if legal.in_check else 'no_moves'
+            break
+        move = policies[is_white].choose(field, is_white, legal.moves)
+        make_move(field, *move, promotion='Queen')
+        moves_played.append(move_name(move))
+        is_white = not is_white
+    return {
+        'seed': seed,
+        'variant': variant,
+        'white': white_spec,
+        'black': black_spec,
+        'result': result,
+        'reason': reason,
+        'plies': len(moves_played),
+        'seconds': round(time.perf_counter() - started, 4),
+        'moves': moves_played,
+    }
+
+
+def _play_task(task):
+    return play_game(*task)
+
+
+def run_games(variant, white_spec, black_spec, games, seed=0, workers=1, max_plies=300):
+    tasks = ((variant, white_spec, black_spec, seed + index, max_plies) for index in range(games))
+    if workers == 1:
+        for task in tasks:
+            yield _play_task(task)
+        return
+    with Pool(workers) as pool:
+        # Задачи отдаются пулу порциями, чтобы очередь не росла вместе с числом партий.
+        while True:
+            batch = [task for _, task in zip(range(BATCH_SIZE * workers), tasks)]
+            if not batch:
+                break
+            yield from pool.imap_unordered(_play_task, batch, chunksize=8)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Пакетная игра без консоли с записью партий в JSONL')
+    parser.add_argument('--variant', choices=sorted(START_POSITIONS), default='custom')
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--white', default='random', help='random, greedy, capture или engine:N')
+    parser.add_argument('--black', default='random', help='random, greedy, capture или engine:N')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-plies', type=int, default=300)
+    parser.add_argument('--output', default='-', help='файл JSONL (по умолчанию stdout)')
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    profiling.start_from_args(args)
+    if profiling.enabled() and args.workers > 1:
+        # Счетчики живут в памяти процесса, поэтому при профилировании партии играются здесь же.
+        print('Профилирование: партии играются в одном процессе', file=sys.stderr)
+        args.workers = 1
+
+    for spec in (args.white, args.black):
+        try:
+            make_policy(spec, random.Random())
+        except ValueError as error:
+            parser.error(str(error))
+
+    output = sys.stdout if args.output == '-' else open(args.output, 'a')
+    totals = {'1-0': 0, '0-1': 0, '1/2-1/2': 0}
+    plies = 0
+    started = time.perf_counter()
+    try:
+        for record in run_games(args.variant, args.white, args.black, args.games, args.seed, args.workers, args.max_plies):
+            output.write(json.dumps(record, ensure_ascii=False) + '\n')
+            output.flush()
+            totals[record['result']] += 1
+            plies += record['plies']
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    elapsed = time.perf_counter() - started
+    played = sum(totals.values())
+    print(f'Партий: {played}, белые {totals["1-0"]}, черные {totals["0-1"]}, ничьи {totals["1/2-1/2"]}; '
+          f'{played / elapsed:.1f} партий/с, {plies / elapsed:.0f} полуходов/с', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,312 @@
+import argparse
+import asyncio
+import itertools
+import os
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from .bitboard import BitField
+from .checkers import CheckersEngine
+from .engine import Engine
+from .gamelog import GameLog, GameWriter, RESULTS, square_name
+from .legal import LegalMoves
+from .rules import START_POSITIONS, AttackMap, start_position, position_text, make_move, unmake_move
+
+SIDES = {'white': True, 'black': False, 'белые': True, 'черные': False}
+PROMOTIONS = {'Q': 'Queen', 'R': 'Rook', 'B': 'Bishop', 'N': 'Knight'}
+STATUS_WORDS = {'check': 'шах', 'checkmate': 'мат', 'stalemate': 'пат'}
+DEFAULT_PORT = 8765
+ENGINE_DEPTH = 3
+ENGINE_TIME_LIMIT = 1.0
+
+_engines = {}
+
+
+def _engine_move(field, is_white, moves, depth, time_limit, checkers=False):
+    # Выполняется в процессе пула: движок со своей таблицей транспозиций
+    # создается один раз на процесс и переиспользуется между партиями.
+    engine = _engines.get((checkers, depth, time_limit))
+    if engine is None:
+        engine_class = CheckersEngine if checkers else Engine
+        engine = _engines[checkers, depth, time_limit] = engine_class(max_depth=depth, time_limit=time_limit)
+    return engine.choose_move(field, is_white, moves)
+
+
+def move_text(move):
+    r, c, end_r, end_c = move
+    return f'{square_name(r * 8 + c)}-{square_name(end_r * 8 + end_c)}'
+
+
+def parse_square(text):
+    text = text.lower()
+    if len(text) != 2 or text[0] not in 'abcdefgh' or text[1] not in '12345678':
+        raise ValueError(f'некорректная клетка {text}')
+    return int(text[1]) - 1, ord(text[0]) - ord('a')
+
+
+class ProtocolError(Exception):
+    pass
+
+
+class GameSession:
+    def __init__(self, game_id, variant, engine_side=None, use_bitboards=False):
+        self.id = game_id
+        self.variant = variant
+        self.engine_side = engine_side
+        self.field = start_position(variant)
+        if use_bitboards:
+            self.field = BitField(self.field)
+        self.is_white = True
+        self.history = []
+        self.log = GameLog(self.field)
+        self.attack_map = AttackMap(self.field)
+        self.lock = asyncio.Lock()
+        self._legal = None
+
+    @property
+    def legal(self):
+        if self._legal is None:
+            self._legal = LegalMoves(self.field, self.is_white)
+        return self._legal
+
+    @property
+    def finished(self):
+        return self.log.result != 0
+
+    @property
+    def engine_to_move(self):
+        return not self.finished and self.engine_side == self.is_white
+
+    def play(self, move, promotion='Queen'):
+        if self.finished:
+            raise ProtocolError('партия окончена')
+        if move not in self.legal.moves:
+            raise ProtocolError(f'ход {move_text(move)} не разрешен')
+        record = make_move(self.field, *move, promotion=promotion)
+        self.history.append(record)
+        self.attack_map.update(record.squares)
+        self.log.append(self.field, record)
+        self.is_white = not self.is_white
+        self._legal = None
+        status = self.legal.status()
+        if status == 'checkmate':
+            self.log.result = 2 if self.is_white else 1
+        elif status == 'stalemate':
+            self.log.result = 3
+        return status
+
+    def undo(self, count):
+        count = min(count, len(self.history))
+        for _ in range(count):
+            record = self.history.pop()
+            unmake_move(self.field, record)
+            self.attack_map.update(record.squares)
+            self.log.pop()
+        if count:
+            self.is_white = len(self.history) % 2 == 0
+            self.log.result = 0
+            self._legal = None
+        return count
+
+    def threats(self):
+        return sorted(self.attack_map.threatened_pieces(self.is_white)[0])
+
+    def board(self):
+        return position_text(self.field)
+
+
+class GameServer:
+    def __init__(self, executor=None, engine_depth=ENGINE_DEPTH, engine_time=ENGINE_TIME_LIMIT,
+                 archive=None, use_bitboards=False):
+        self.executor = executor
+        self.engine_depth = engine_depth
+        self.engine_time = engine_time
+        self.archive = archive
+        self.use_bitboards = use_bitboards
+        self.games = {}
+        self.ids = itertools.count(1)
+        self.moves = 0
+        self.connections = 0
+        self.commands = {
+            'new': self.cmd_new, 'move': self.cmd_move, 'moves': self.cmd_moves,
+            'threats': self.cmd_threats, 'угрозы': self.cmd_threats,
+            'undo': self.cmd_undo, 'откат': self.cmd_undo,
+            'notation': self.cmd_notation, 'нотация': self.cmd_notation,
+            'board': self.cmd_board, 'close': self.cmd_close, 'stats': self.cmd_stats,
+        }
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        # Партии, начатые в этом соединении: после отключения клиента они закрываются,
+        # иначе брошенные партии копились бы в self.games до остановки сервера.
+        owned = []
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                words = line.decode('utf-8', 'replace').split()
+                if not words:
+                    continue
+                if words[0] in ('quit', 'stop'):
+                    break
+                writer.write((await self.execute(words, owned) + '\n').encode('utf-8'))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+            for game_id in owned:
+                try:
+                    await self.close_game(game_id)
+                except ProtocolError:
+                    pass
+
+    async def execute(self, words, owned=None):
+        command = self.commands.get(words[0].lower())
+        if command is None:
+            return f'error неизвестная команда {words[0]}'
+        try:
+            reply = command(*words[1:])
+        except TypeError:
+            return f'error неверное число аргументов для {words[0]}'
+        try:
+            result = await reply
+        except (ProtocolError, ValueError) as error:
+            return f'error {error}'
+        except Exception as error:
+            # Сбой одной команды (пул движка, редкий случай правил) не должен рвать
+            # соединение вместе с его партиями: ошибка пишется в лог, клиент получает error.
+            print(f'Ошибка команды {" ".join(words)}:', file=sys.stderr)
+            traceback.print_exc()
+            return f'error внутренняя ошибка: {error!r}'
+        if command == self.cmd_new and owned is not None:
+            owned.append(result[0])
+        return 'ok' + ''.join(' ' + word for word in result if word)
+
+    def game(self, game_id, remove=False):
+        game = self.games.pop(game_id, None) if remove else self.games.get(game_id)
+        if game is None:
+            raise ProtocolError(f'нет партии {game_id}')
+        return game
+
+    async def engine_reply(self, game):
+        loop = asyncio.get_running_loop()
+        move = await loop.run_in_executor(self.executor, _engine_move, game.field, game.is_white,
+                                          game.legal.moves, self.engine_depth, self.engine_time,
+                                          game.variant == 'checkers')
+        status = game.play(move)
+        self.moves += 1
+        return move, status
+
+    async def cmd_new(self, variant='classic', engine_side=None):
+        if variant not in START_POSITIONS:
+            raise ProtocolError(f'неизвестный вариант {variant}')
+        if engine_side is not None and engine_side not in SIDES:
+            raise ProtocolError(f'неизвестная сторона {engine_side}')
+        game = GameSession(str(next(self.ids)), variant, SIDES.get(engine_side), self.use_bitboards)
+        self.games[game.id] = game
+        try:
+            async with game.lock:
+                if game.engine_to_move:
+                    move, status = await self.engine_reply(game)
+                    return [game.id, move_text(move), STATUS_WORDS.get(status)]
+        except BaseException:
+            # Номер партии клиент не получил - закрыть ее будет некому.
+            self.games.pop(game.id, None)
+            raise
+        return [game.id]
+
+    async def cmd_move(self, game_id, start, end, promotion='Q'):
+        game = self.game(game_id)
+        if promotion.upper() not in PROMOTIONS:
+            raise ProtocolError(f'нельзя превратиться в {promotion}')
+        move = parse_square(start) + parse_square(end)
+        async with game.lock:
+            if game.engine_to_move:
+                raise ProtocolError('сейчас ходит компьютер')
+            status = game.play(move, PROMOTIONS[promotion.upper()])
+            self.moves += 1
+            reply = [move_text(move)]
+            if game.engine_to_move:
+                move, status = await self.engine_reply(game)
+                reply.append(move_text(move))
+        return reply + [STATUS_WORDS.get(status)]
+
+    async def cmd_moves(self, game_id):
+        game = self.game(game_id)
+        return [move_text(move) for move in game.legal.moves]
+
+    async def cmd_threats(self, game_id):
+        game = self.game(game_id)
+        return [square_name(r * 8 + c) for r, c in game.threats()]
+
+    async def cmd_undo(self, game_id, count='1'):
+        game = self.game(game_id)
+        async with game.lock:
+            if not count.isdigit():
+                raise ProtocolError(f'некорректное число ходов {count}')
+            reply = [str(game.undo(int(count)))]
+            if game.engine_to_move:
+                move, status = await self.engine_reply(game)
+                reply += [move_text(move), STATUS_WORDS.get(status)]
+        return reply
+
+    async def cmd_notation(self, game_id):
+        return [self.game(game_id).log.notation().replace('\n', '; ')]
+
+    async def cmd_board(self, game_id):
+        game = self.game(game_id)
+        return [game.board(), 'w' if game.is_white else 'b']
+
+    async def close_game(self, game_id):
+        # Под замком партии: ход компьютера, который еще считается, успеет
+        # попасть в журнал до записи в архив.
+        async with self.game(game_id).lock:
+            game = self.game(game_id, remove=True)
+            if self.archive is not None and len(game.log):
+                self.archive.write(game.log)
+        return game
+
+    async def cmd_close(self, game_id):
+        return [RESULTS[(await self.close_game(game_id)).log.result]]
+
+    async def cmd_stats(self):
+        return [f'партий={len(self.games)}', f'соединений={self.connections}', f'ходов={self.moves}']
+
+
+async def serve(host, port, server):
+    listener = await asyncio.start_server(server.handle, host, port, limit=1 << 16, backlog=1024)
+    addresses = ', '.join(str(sock.getsockname()) for sock in listener.sockets)
+    print(f'Сервер слушает {addresses}', file=sys.stderr)
+    async with listener:
+        await listener.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Сервер партий: много одновременных игр по строковому протоколу TCP')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--engine-workers', type=int, default=os.cpu_count() or 1,
+                        help='процессов для ходов компьютера')
+    parser.add_argument('--engine-depth', type=int, default=ENGINE_DEPTH)
+    parser.add_argument('--engine-time', type=float, default=ENGINE_TIME_LIMIT, help='секунд на ход компьютера')
+    parser.add_argument('--archive', help='дописывать закрытые партии в двоичный архив')
+    parser.add_argument('--bitboards', action='store_true', help='хранить доски на битбордах')
+    args = parser.parse_args()
+
+    archive = GameWriter(args.archive) if args.archive else None
+    with ProcessPoolExecutor(args.engine_workers) as executor:
+        server = GameServer(executor, args.engine_depth, args.engine_time, archive, args.bitboards)
+        try:
+            asyncio.run(serve(args.host, args.port, server))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if archive is not None:
+                archive.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,398 @@
+import argparse
+import mmap
+import os
+import random
+import struct
+import sys
+import time
+from array import array
+from multiprocessing import Pool
+from .engine import MATE
+from .legal import LegalMoves
+from .position import Position
+from .rules import King, Queen, Rook, Bishop, Knight, Wizard, Archer, Thunderer, make_move, unmake_move
+from .zobrist import STATE_LIMITS
+
+# Таблицы строятся только для материала без пешек и шашек: правила остальных
+# фигур симметричны относительно поворотов и отражений доски, поэтому белый
+# король всегда приводится в треугольник a1-d1-d4 (10 клеток).
+PIECE_CLASSES = {'K': King, 'Q': Queen, 'R': Rook, 'B': Bishop, 'N': Knight, 'W': Wizard, 'A': Archer, 'T': Thunderer}
+PIECE_LETTERS = {piece_class: letter for letter, piece_class in PIECE_CLASSES.items()}
+LETTER_ORDER = 'KQRBNWAT'
+DEFAULT_SETS = ['KQK', 'KWK', 'KAK', 'KTK']
+TABLE_DIR = 'tablebases'
+MAGIC = b'CHT2'
+HEADER = struct.Struct('<4s8sI')
+WIN, DRAW, LOSS = 1, 0, -1
+INVALID = 255
+MAX_DISTANCE = 253
+CHUNKS_PER_WORKER = 8
+
+
+def _transform(t, sq):
+    r, c = divmod(sq, 8)
+    if t & 4:
+        r, c = c, r
+    if t & 1:
+        r = 7 - r
+    if t & 2:
+        c = 7 - c
+    return r * 8 + c
+
+
+TRANSFORMS = [[_transform(t, sq) for sq in range(64)] for t in range(8)]
+TRIANGLE = [r * 8 + c for c in range(4) for r in range(c + 1)]
+TRIANGLE_INDEX = {sq: i for i, sq in enumerate(TRIANGLE)}
+KING_TRANSFORM = [next(t for t in range(8) if TRANSFORMS[t][sq] in TRIANGLE_INDEX) for sq in range(64)]
+
+
+def normalize(material):
+    material = material.upper()
+    split = material.find('K', 1)
+    if not material.startswith('K') or split < 0 or material.count('K') != 2:
+        raise ValueError(f'Материал должен содержать двух королей: {material}')
+    if any(letter not in PIECE_CLASSES for letter in material):
+        raise ValueError(f'Поддерживаются только фигуры {LETTER_ORDER}: {material}')
+    white, black = material[:split], material[split:]
+    return ''.join(sorted(white, key=LETTER_ORDER.index)) + ''.join(sorted(black, key=LETTER_ORDER.index))
+
+
+class Table:
+    def __init__(self, material, values=None):
+        self.material = normalize(material)
+        split = self.material.find('K', 1)
+        self.pieces = [PIECE_CLASSES[letter](index < split) for index, letter in enumerate(self.material)]
+        self.states = [STATE_LIMITS.get(type(piece).__name__, 0) + 1 for piece in self.pieces]
+        self.size = 2 * len(TRIANGLE) * 64 ** (len(self.pieces) - 1)
+        for states in self.states:
+            self.size *= states
+        self.values = values
+
+    def index(self, squares, counters, white_to_move):
+        transform = TRANSFORMS[KING_TRANSFORM[squares[0]]]
+        index = TRIANGLE_INDEX[transform[squares[0]]]
+        for sq in squares[1:]:
+            index = index * 64 + transform[sq]
+        for counter, states in zip(counters, self.states):
+            if states > 1:
+                index = index * states + min(counter, states - 1)
+        return index * 2 + (0 if white_to_move else 1)
+
+    def decode(self, index):
+        white_to_move = not index & 1
+        index >>= 1
+        counters = []
+        for states in reversed(self.states):
+            counters.append(index % states)
+            index //= states
+        squares = []
+        for _ in range(len(self.pieces) - 1):
+            squares.append(index % 64)
+            index //= 64
+        squares.append(TRIANGLE[index])
+        return squares[::-1], counters[::-1], white_to_move
+
+    def result(self, index):
+        value = self.values[index]
+        if value == 0 or value == INVALID:
+            return DRAW, None
+        distance = value - 1
+        return (WIN if distance & 1 else LOSS), distance
+
+
+def material_of(field, limit):
+    white, black = [], []
+    for sq in range(64):
+        piece = field[sq >> 3][sq & 7]
+        if piece != '.':
+            if type(piece) not in PIECE_LETTERS or len(white) + len(black) >= limit:
+                return None
+            (white if piece.is_white else black).append((LETTER_ORDER.index(PIECE_LETTERS[type(piece)]), sq))
+    white.sort()
+    black.sort()
+    return white, black
+
+
+class TablebaseSet:
+    def __init__(self, directory=TABLE_DIR, tables=None):
+        self.directory = directory
+        self.tables = dict(tables or {})
+        self.files = []
+        if os.path.isdir(directory):
+            for name in sorted(os.listdir(directory)):
+                if name.endswith('.tb') and name[:-3] not in self.tables:
+                    self._open(os.path.join(directory, name))
+        self.max_pieces = max([len(table.pieces) for table in self.tables.values()] + [2])
+        self.probes = 0
+
+    def _open(self, path):
+        with open(path, 'rb') as file:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, material, size = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            data.close()
+            raise ValueError(f'{path}: не файл таблицы')
+        table = Table(material.rstrip(b'\0').decode())
+        table.values = memoryview(data)[HEADER.size:HEADER.size + size]
+        self.tables[table.material] = table
+        self.files.append(data)
+
+    def close(self):
+        for table in self.tables.values():
+            if isinstance(table.values, memoryview):
+                table.values.release()
+        for data in self.files:
+            data.close()
+        self.files = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def probe(self, field, is_white):
+        material = material_of(field, self.max_pieces)
+        if material is None:
+            return None
+        self.probes += 1
+        white, black = material
+        if len(white) == len(black) == 1:
+            # Два короля не могут поставить мат: ничья.
+            return DRAW, None
+        name = ''.join(LETTER_ORDER[code] for code, _ in white) + ''.join(LETTER_ORDER[code] for code, _ in black)
+        table = self.tables.get(name)
+        if table is None:
+            swapped = name[name.find('K', 1):] + name[:name.find('K', 1)]
+            table = self.tables.get(swapped)
+            if table is None:
+                return None
+            white, black, is_white = black, white, not is_white
+        squares = [sq for _, sq in white + black]
+        counters = [field.counters[sq] for sq in squares]
+        return table.result(table.index(squares, counters, is_white))
+
+    def score(self, field, is_white, ply):
+        found = self.probe(field, is_white)
+        if found is None:
+            return None
+        result, distance = found
+        if result == WIN:
+            return MATE - (ply + distance)
+        if result == LOSS:
+            return -MATE + ply + distance
+        return 0
+
+
+def _successors(task):
+    material, start, stop, directory = task
+    table = Table(material)
+    subtables = TablebaseSet(directory)
+    # kinds: 0 - обычная позиция, 1 - невозможная, 2 - взятие короля одним ходом
+    # (тоже невозможная), 3 - мат, 4 - пат.
+    kinds = bytearray(stop - start)
+    offsets = array('I', [0])
+    targets = array('I')
+    exit_win = array('H', bytes(2 * (stop - start)))
+    exit_loss = array('H', bytes(2 * (stop - start)))
+    exit_draw = bytearray(stop - start)
+    field = Position([['.'] * 8 for _ in range(8)])
+    pieces = table.pieces
+    for index in range(start, stop):
+        local = index - start
+        squares, counters, white_to_move = table.decode(index)
+        if len(set(squares)) != len(squares):
+            kinds[local] = 1
+            offsets.append(len(targets))
+            continue
+        for piece, sq, counter in zip(pieces, squares, counters):
+            field.set(sq >> 3, sq & 7, piece, counter)
+        legal = LegalMoves(field, white_to_move)
+        moves = legal.moves
+        if legal.attacks.attackers(legal.attacks.kings[not white_to_move], white_to_move):
+            kinds[local], moves = 2, []
+        elif not moves:
+            kinds[local] = 3 if legal.in_check else 4
+        for move in moves:
+            record = make_move(field, *move)
+            start_sq, end_sq = move[0] * 8 + move[1], move[2] * 8 + move[3]
+            if not record.captured:
+                moved = [end_sq if sq == start_sq and field[start_sq >> 3][start_sq & 7] == '.' else sq for sq in squares]
+                targets.append(table.index(moved, [field.counters[sq] for sq in moved], not white_to_move))
+            else:
+                found = subtables.probe(field, not white_to_move)
+                if found is None:
+                    raise ValueError(f'Для {table.material} сначала нужно построить таблицы с меньшим материалом')
+                result, distance = found
+                if result == LOSS:
+                    if not exit_win[local] or distance + 1 < exit_win[local]:
+                        exit_win[local] = distance + 1
+                elif result == WIN:
+                    exit_loss[local] = max(exit_loss[local], distance)
+                else:
+                    exit_draw[local] = 1
+            unmake_move(field, record)
+        offsets.append(len(targets))
+        for sq in squares:
+            field.set(sq >> 3, sq & 7, '.')
+    subtables.close()
+    return start, kinds, offsets, targets, exit_win, exit_loss, exit_draw
+
+
+def generate(material, directory=TABLE_DIR, workers=1):
+    table = Table(material)
+    size = table.size
+    chunk = max(1, size // (workers * CHUNKS_PER_WORKER))
+    tasks = [(table.material, start, min(start + chunk, size), directory) for start in range(0, size, chunk)]
+    if workers == 1:
+        parts = [_successors(task) for task in tasks]
+    else:
+        with Pool(workers) as pool:
+            parts = pool.map(_successors, tasks)
+
+    values = bytearray(size)
+    remaining = array('I', bytes(4 * size))
+    longest = array('H', bytes(2 * size))
+    escape = bytearray(size)
+    first_edge = array('Q', bytes(8 * (size + 1)))
+    buckets = [[] for _ in range(MAX_DISTANCE + 3)]
+    targets = array('I')
+    for start, kinds, offsets, chunk_targets, exit_win, exit_loss, exit_draw in parts:
+        base = len(targets)
+        targets.extend(chunk_targets)
+        for local, kind in enumerate(kinds):
+            index = start + local
+            first_edge[index + 1] = base + offsets[local + 1]
+            if kind == 1 or kind == 2:
+                # Король под боем у не ходящей стороны - позиция не возникает в партии,
+                # поэтому она не получает оценки и не участвует в ретроградном проходе.
+                values[index] = INVALID
+            elif kind == 3:
+                buckets[0].append(index)
+            elif kind == 4:
+                continue
+            else:
+                remaining[index] = offsets[local + 1] - offsets[local]
+                longest[index] = exit_loss[local]
+                escape[index] = 1 if exit_draw[local] or exit_win[local] else 0
+                if exit_win[local]:
+                    buckets[exit_win[local]].append(index)
+                elif not remaining[index] and not escape[index]:
+                    buckets[longest[index] + 1].append(index)
+    parts = None
+
+    # Обратные ребра: для каждой позиции - список позиций, из которых в нее можно прийти.
+    first_pred = array('Q', bytes(8 * (size + 1)))
+    for target in targets:
+        first_pred[target + 1] += 1
+    for index in range(size):
+        first_pred[index + 1] += first_pred[index]
+    fill = array('Q', first_pred)
+    preds = array('I', bytes(4 * len(targets)))
+    for index in range(size):
+        for edge in range(first_edge[index], first_edge[index + 1]):
+            target = targets[edge]
+            preds[fill[target]] = index
+            fill[target] += 1
+    targets = fill = None
+
+    # Ретроградный проход по возрастанию расстояния: нечетное расстояние -
+    # выигрыш ходящего, четное - проигрыш.
+    for distance in range(MAX_DISTANCE + 1):
+        for index in buckets[distance]:
+            if values[index]:
+                continue
+            values[index] = distance + 1
+            for edge in range(first_pred[index], first_pred[index + 1]):
+                previous = preds[edge]
+                if values[previous]:
+                    continue
+                if not distance & 1:
+                    buckets[distance + 1].append(previous)
+                else:
+                    remaining[previous] -= 1
+                    if distance > longest[previous]:
+                        longest[previous] = distance
+                    if not remaining[previous] and not escape[previous]:
+                        buckets[longest[previous] + 1].append(previous)
+        buckets[distance] = None
+    table.values = values
+    return table
+
+
+def save(table, directory=TABLE_DIR):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{table.material}.tb')
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, table.material.encode(), table.size))
+        file.write(table.values)
+    return path
+
+
+def summary(table):
+    counts = {WIN: 0, DRAW: 0, LOSS: 0}
+    longest = 0
+    for value in table.values:
+        if value == INVALID:
+            continue
+        if value:
+            distance = value - 1
+            counts[WIN if distance & 1 else LOSS] += 1
+            longest = max(longest, distance)
+        else:
+            counts[DRAW] += 1
+    return counts, longest
+
+
+def random_position(table, rng):
+    squares = rng.sample(range(64), len(table.pieces))
+    field = Position([['.'] * 8 for _ in range(8)])
+    for piece, sq, states in zip(table.pieces, squares, table.states):
+        field.set(sq >> 3, sq & 7, piece, rng.randrange(states))
+    return field, rng.random() < 0.5
+
+
+def probe_benchmark(tablebases, material, probes=20000, seed=0):
+    table = tablebases.tables[normalize(material)]
+    rng = random.Random(seed)
+    positions = [random_position(table, rng) for _ in range(1000)]
+    started = time.perf_counter()
+    for i in range(probes):
+        field, is_white = positions[i % len(positions)]
+        tablebases.probe(field, is_white)
+    elapsed = time.perf_counter() - started
+    return probes / elapsed if elapsed else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Построение эндшпильных таблиц ретроградным анализом')
+    parser.add_argument('materials', nargs='*', default=DEFAULT_SETS, help='наборы материала, например KQK KWK')
+    parser.add_argument('--directory', default=TABLE_DIR)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--probe-only', action='store_true', help='не строить таблицы, только замерить скорость опроса')
+    args = parser.parse_args()
+
+    try:
+        materials = sorted({normalize(material) for material in args.materials}, key=len)
+    except ValueError as error:
+        parser.error(str(error))
+
+    if not args.probe_only:
+        for material in materials:
+            started = time.perf_counter()
+            table = generate(material, args.directory, args.workers)
+            path = save(table, args.directory)
+            counts, longest = summary(table)
+            print(f'{table.material:<6} позиций {table.size:>9}  {os.path.getsize(path) / 1024:>8.0f} КБ  '
+                  f'выигрыш {counts[WIN]:>8}  проигрыш {counts[LOSS]:>8}  ничья {counts[DRAW]:>8}  '
+                  f'макс. расстояние {longest:>3}  {time.perf_counter() - started:>7.1f} с')
+
+    with TablebaseSet(args.directory) as tablebases:
+        for material in materials:
+            if material in tablebases.tables:
+                print(f'{material:<6} {probe_benchmark(tablebases, material):>10.0f} опросов/с')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+from array import array
+from hashlib import blake2b
+
+# Счетчики волшебника и громовержца влияют на ходы только до порога,
+# поэтому в ключ попадает значение, обрезанное по этому порогу.
+STATE_LIMITS = {'Wizard': 3, 'Thunderer': 4}
+
+_keys = {}
+
+
+def _random64(label):
+    return int.from_bytes(blake2b(label.encode(), digest_size=8).digest(), 'little')
+
+
+SIDE_KEY = _random64('side')
+
+
+def piece_key(piece, row, col, state):
+    name = type(piece).__name__
+    if name in STATE_LIMITS:
+        state = min(state, STATE_LIMITS[name])
+    label = (name, piece.is_white, state, row * 8 + col)
+    key = _keys.get(label)
+    if key is None:
+        key = _keys[label] = _random64(repr(label))
+    return key
+
+
+def position_key(field, white_to_move):
+    key = 0 if white_to_move else SIDE_KEY
+    for r in range(8):
+        for c in range(8):
+            if field[r][c] != '.':
+                key ^= piece_key(field[r][c], r, c, field.counters[r * 8 + c])
+    return key
+
+
+def update_key(key, field, record):
+    for r, c, old, counter in record.saved:
+        if old != '.':
+            key ^= piece_key(old, r, c, counter)
+        if field[r][c] != '.':
+            key ^= piece_key(field[r][c], r, c, field.counters[r * 8 + c])
+    return key ^ SIDE_KEY
+
+
+class TranspositionTable:
+    def __init__(self, size=1 << 16):
+        buckets = 1
+        while buckets < size:
+            buckets <<= 1
+        self.mask = buckets - 1
+        self.keys = array('Q', bytes(16 * buckets))
+        self.depths = array('h', [-1]) * (2 * buckets)
+        self.values = [None] * (2 * buckets)
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.stores = 0
+
+    def __len__(self):
+        return len(self.values)
+
+    def clear(self):
+        for i in range(len(self.values)):
+            self.depths[i] = -1
+            self.values[i] = None
+
+    def probe(self, key, depth=0):
+        index = (key & self.mask) * 2
+        for slot in (index, index + 1):
+            if self.depths[slot] >= 0 and self.keys[slot] == key:
+                if self.depths[slot] >= depth:
+                    self.hits += 1
+                    return self.values[slot]
+                self.misses += 1
+                return None
+        if self.depths[index] >= 0 or self.depths[index + 1] >= 0:
+            self.collisions += 1
+        self.misses += 1
+        return None
+
+    def store(self, key, value, depth=0):
+        index = (key & self.mask) * 2
+        # Первый слот корзины заменяется только более глубоким результатом,
+        # второй - всегда.
+        if self.depths[index + 1] >= 0 and self.keys[index + 1] == key and self.keys[index] != key:
+            slot = index + 1
+        elif self.depths[index] < 0 or self.keys[index] == key or depth >= self.depths[index]:
+            slot = index
+        else:
+            slot = index + 1
+        self.keys[slot] = key
+        self.depths[slot] = depth
+        self.values[slot] = value
+        self.stores += 1
+
+    def stats(self):
+        probes = self.hits + self.misses
+        used = sum(1 for depth in self.depths if depth >= 0)
+        return {
+            'size': len(self.values),
+            'used': used,
+            'hits': self.hits,
+            'misses': self.misses,
+            'collisions': self.collisions,
+            'stores': self.stores,
+            'hit_rate': self.hits / probes if probes else 0.0,
+        }
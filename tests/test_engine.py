@@ -0,0 +1,27 @@
+from chess_game.engine import Engine, MATE
+from chess_game.legal import LegalMoves
+from chess_game.rules import make_move, parse_position
+
+# Белые ставят мат в два хода: 1. Kg6 Kg8 2. Qa8#.
+MATE_IN_TWO = '7k/8/5K2/8/8/8/8/Q7'
+
+
+def play_out(engine, text, max_plies=10):
+    field, is_white, scores = parse_position(text), True, []
+    for _ in range(max_plies):
+        legal = LegalMoves(field, is_white)
+        if not legal.moves:
+            return legal.is_checkmate, scores
+        result = engine.search(field, is_white, depth=6)
+        scores.append(result.score)
+        make_move(field, *result.move, promotion='Queen')
+        is_white = not is_white
+    return False, scores
+
+
+def test_mate_distance_survives_table_reuse():
+    engine = Engine(max_depth=6)
+    for _ in range(2):
+        mated, scores = play_out(engine, MATE_IN_TWO)
+        assert mated
+        assert scores == [MATE - 3, -(MATE - 2), MATE - 1]
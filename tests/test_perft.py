@@ -0,0 +1,14 @@
+from chess_game.perft import compare
+
+
+def test_compare_checks_speed_only_on_request():
+    baseline = {'start': {'depth': 3, 'nodes': 8902, 'nps': 100000}}
+    slow = {'start': {'depth': 3, 'nodes': 8902, 'nps': 10000}}
+    assert compare(slow, baseline) == []
+    assert len(compare(slow, baseline, 0.2)) == 1
+
+
+def test_compare_reports_node_mismatch():
+    baseline = {'start': {'depth': 3, 'nodes': 8902, 'nps': 100000}}
+    wrong = {'start': {'depth': 3, 'nodes': 8901, 'nps': 100000}}
+    assert len(compare(wrong, baseline)) == 1
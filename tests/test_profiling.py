@@ -0,0 +1,36 @@
+import sys
+import types
+
+from chess_game import profiling
+from chess_game.bitboard import BitField
+from chess_game.engine import Engine
+from chess_game import rules
+from chess_game.rules import start_position
+
+
+def test_bitboard_move_generation_is_counted():
+    profiling.enable()
+    try:
+        Engine(max_depth=2).search(BitField(start_position('classic')), True)
+        counted = profiling.stats()
+    finally:
+        profiling.disable()
+        profiling.reset()
+    assert counted['bitboard.move_masks']['calls'] > 0
+    assert counted['bitboard.generate_moves']['calls'] > 0
+
+
+def test_disable_unwraps_modules_imported_while_enabled():
+    make_move = rules.make_move
+    late = types.ModuleType('late_import')
+    sys.modules[late.__name__] = late
+    profiling.enable()
+    try:
+        exec('from chess_game.rules import make_move', late.__dict__)
+        assert late.make_move is not make_move
+    finally:
+        profiling.disable()
+        profiling.reset()
+        sys.modules.pop(late.__name__)
+    assert late.make_move is make_move
+    assert rules.make_move is make_move
@@ -0,0 +1,44 @@
+import asyncio
+
+from chess_game.server import GameServer
+
+
+async def _session(server, lines, disconnect=False):
+    listener = await asyncio.start_server(server.handle, '127.0.0.1', 0)
+    port = listener.sockets[0].getsockname()[1]
+    async with listener:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        replies = []
+        for line in lines:
+            writer.write((line + '\n').encode('utf-8'))
+            await writer.drain()
+            replies.append((await reader.readline()).decode('utf-8').split())
+        if not disconnect:
+            writer.write(b'quit\n')
+        writer.close()
+        await writer.wait_closed()
+        while server.connections:
+            await asyncio.sleep(0.01)
+    return replies
+
+
+def test_games_are_closed_when_client_leaves():
+    server = GameServer()
+    replies = asyncio.run(_session(server, ['new classic', 'new checkers', 'stats'], disconnect=True))
+    assert replies[2][1] == 'партий=2'
+    assert server.games == {}
+    replies = asyncio.run(_session(server, ['new classic', 'move 3 e2 e4']))
+    assert replies[1][:2] == ['ok', 'e2-e4']
+    assert server.games == {}
+
+
+def test_failing_command_keeps_connection():
+    server = GameServer()
+
+    async def broken_engine(game):
+        raise RuntimeError('engine crashed')
+    server.engine_reply = broken_engine
+    replies = asyncio.run(_session(server, ['new classic', 'new classic white', 'stats']))
+    assert replies[0][0] == 'ok'
+    assert replies[1][0] == 'error'
+    assert replies[2] == ['ok', 'партий=1', 'соединений=1', 'ходов=0']
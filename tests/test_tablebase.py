@@ -0,0 +1,15 @@
+from chess_game.tablebase import DRAW, LOSS, WIN, generate, summary
+
+
+def test_kqk_summary(tmp_path):
+    counts, longest = summary(generate('KQK', str(tmp_path)))
+    assert counts == {WIN: 22589, DRAW: 3590, LOSS: 31378}
+    assert longest == 20
+
+
+def test_kwk_summary(tmp_path):
+    # Волшебник бьет только как слон (телепортация - лишь на пустые клетки), поэтому
+    # мат не ставится; позиции со взятием короля невозможны и в счет не входят.
+    counts, longest = summary(generate('KWK', str(tmp_path)))
+    assert counts == {WIN: 0, DRAW: 260692, LOSS: 0}
+    assert longest == 0